@@ -0,0 +1,92 @@
+import sys
+from pathlib import Path
+
+# Add the src folder to Python path
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root / "src"))
+
+import argparse
+import time
+from common.config_handler import config, ConfigHandler
+from common.error_handler import ExpectedCustomError
+
+# Per-access cost of config settings: the old @property accessors vs the resolved slots.
+#   python benchmarks/config_access_benchmark.py --accesses 1000000
+
+
+class PropertyConfig:
+    """The old accessors: every read goes through dict.get, and paths through _get_path"""
+    def __init__(self, raw, root):
+        self._config = raw
+        self._project_root = root
+
+    def _get_path(self, key: str) -> Path:
+        raw = self._config.get(key)
+        if not raw:
+            raise ExpectedCustomError(
+                f"❌ Config key '{key}' missing or empty in config.json.\n"
+                f"\n📌 HOW TO FIX:\n"
+                f"1. Open 'config/config.json'.\n"
+                f"2. Add or set '{key}' to a valid relative path string.\n"
+                f"3. Save and restart the application."
+            )
+        return self._project_root / raw
+
+    @property
+    def client_header_name(self) -> str:
+        return self._config.get("header_name_for_clients", "Клиент")
+
+    @property
+    def optivik_drug_col_index(self) -> int:
+        return self._config.get("optivik_drug_col", 1) - 1 #df is 0 based
+
+    @property
+    def path_for_vtorichka(self) -> Path:
+        return self._get_path("path_for_vtorichka")
+
+    @property
+    def path_for_po_gorodom(self) -> Path:
+        base_path = Path(self._get_path("path_for_po_gorodom"))
+        folder_path = base_path / "po_gorodom"
+        folder_path.mkdir(parents=True,exist_ok=True)
+        return folder_path
+
+
+def timed(label, func, accesses):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<36} {elapsed / accesses * 1e9:>9.0f} ns/access")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accesses", type=int, default=1000000)
+    args = parser.parse_args()
+    n = args.accesses
+    old = PropertyConfig(config._config, ConfigHandler._project_root)
+    print(f"{n} accesses per setting")
+
+    for name in ["client_header_name", "optivik_drug_col_index", "path_for_vtorichka", "path_for_po_gorodom"]:
+        # the po_gorodom property also ran a mkdir per access, so it gets fewer rounds
+        rounds = n if name != "path_for_po_gorodom" else max(1, n // 100)
+        print(name)
+        before = timed("@property (old)", lambda: [getattr(old, name) for _ in range(rounds)][-1], rounds)
+        after = timed("resolved slot", lambda: [getattr(config, name) for _ in range(rounds)][-1], rounds)
+        print(f"  {'same value' if before == after else 'DIFFERENT'}")
+
+    # the typical hot-loop shape: a lambda per row reading a header name
+    rows = [{"Клиент": i} for i in range(n)]
+    print("per-row lambda reading config.client_header_name")
+    timed("@property (old)", lambda: list(map(lambda row: row[old.client_header_name], rows)), n)
+    timed("resolved slot", lambda: list(map(lambda row: row[config.client_header_name], rows)), n)
+
+    print("reload")
+    rounds = max(1, n // 100)
+    timed("refresh(), mtime unchanged", lambda: [config.refresh() for _ in range(rounds)], rounds)
+    timed("full load (read + resolve)", lambda: [config._load(config._config_path) for _ in range(rounds)], rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import sys
+from pathlib import Path
+
+# Add the src folder to Python path
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root / "src"))
+
+import argparse
+import tempfile
+import time
+import zipfile
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
+from common.data_manager import DataManager
+from excel_automation.outlining_apply_formula import OutlineAndFormulas
+
+# Report-sheet formatting on a synthetic regional sheet, per-cell loop vs RangeStyler.
+#   python benchmarks/formatting_benchmark.py --rows 100000 --drugs 12 --group-every 25
+
+
+def make_report_sheet(rows, drugs, group_every):
+    """Sheet laid out like a regional report: 2 header rows, hidden row 3, data, 4 final rows"""
+    wb = Workbook()
+    ws = wb.active
+    drug_cols = [name for i in range(drugs) for name in (f"Drug {i}", f"Drug {i}")]
+    ws.append(["", "Клиент", "Регион", "Территори"] + drug_cols + ["Итого", "Итого"])
+    ws.append(["", "", "", ""] + ["Количество", "Сумма продажи"] * (drugs + 1))
+    ws.append(["index"])
+
+    grouped_rows = []
+    for i in range(rows):
+        row = i + 4
+        if i % group_every == 0:
+            grouped_rows.append(row)
+        ws.append([i % group_every, f"Client {i}", "Region", "Territory"] + [float(i % 97)] * (2 * drugs + 2))
+    final_sum = rows + 4
+    for label in ["FINAL SUM", "FINAL SUM ( Minus 10 % )", "Final summa for Reklama", "Final summa for Leksiya"]:
+        ws.append(["", label])
+    return wb, ws, grouped_rows, final_sum
+
+
+def per_cell_formatting(ws, grouped_rows, final_sum_row):
+    """The old OutlineAndFormulas.apply_formatting cell loop (new style objects for every cell)"""
+    header_color = PatternFill(start_color="F4ECC5", end_color="F4ECC5", fill_type="solid")
+    optovik_color = PatternFill(start_color="FFE4B5", end_color="FFE4B5", fill_type="solid")
+    default_border = Border(
+        left=Side(style='thin', color='CCCC00'),
+        right=Side(style='thin', color='CCCC00'),
+        top=Side(style='thin', color='CCCC00'),
+        bottom=Side(style='thin', color='CCCC00')
+    )
+    defult_font = Font(name="Arial", size=7, color="000000")
+    header_optovik_font = Font(name="Arial", size=8, bold=True, color="000000")
+    final_sums_font = Font(name="Arial", size=8, italic=True, color="000000")
+
+    ws.column_dimensions[get_column_letter(1)].width = 4
+    ws.column_dimensions[get_column_letter(2)].width = 40
+    ws.column_dimensions[get_column_letter(3)].width = 10
+    ws.column_dimensions[get_column_letter(4)].width = 10
+    for col in range(5, ws.max_column + 1):
+        ws.column_dimensions[get_column_letter(col)].width = 18 if col % 2 == 0 else 11
+    ws.row_dimensions[1].height = 35
+    ws.row_dimensions[2].height = 23
+
+    for row in ws.iter_rows(min_row=1, max_row=2):
+        for cell in row:
+            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+            cell.border = default_border
+            cell.fill = header_color
+            cell.font = header_optovik_font
+
+    for row in ws.iter_rows(min_row=4, max_row=ws.max_row, min_col=1, max_col=ws.max_column):
+        for cell in row:
+            if cell.row in grouped_rows:
+                cell.fill = optovik_color
+                cell.border = default_border
+                if cell.column <= 4:
+                    cell.font = header_optovik_font
+                elif cell.column > 4:
+                    cell.font = defult_font
+                    cell.number_format = '_(* #,##0.00_);_(* -#,##0.00_);_(* "-"??_);_(@_)'
+            elif cell.column > 4 and cell.row < final_sum_row:
+                cell.number_format = '_(* #,##0.00_);_(* -#,##0.00_);_(* "-"??_);_(@_)'
+                cell.font = defult_font
+            elif cell.row >= final_sum_row:
+                if cell.column > 4:
+                    cell.number_format = '_(* #,##0.00_);_(* -#,##0.00_);_(* "-"??_);_(@_)'
+                cell.font = final_sums_font
+                cell.border = default_border
+                cell.fill = header_color
+            elif cell.column <= 4 and cell.row < final_sum_row:
+                cell.font = defult_font
+
+    ws.row_dimensions[3].hidden = True
+    ws.column_dimensions['A'].hidden = True
+    ws.freeze_panes = 'E3'
+
+
+def range_formatting(ws, grouped_rows, final_sum_row):
+    step_two = OutlineAndFormulas({}, [], DataManager())
+    step_two.grouped_rows = grouped_rows
+    step_two.final_sum = final_sum_row
+    step_two.apply_formatting(ws)
+
+
+def timed(label, formatter, args, path):
+    wb, ws, grouped_rows, final_sum = make_report_sheet(args.rows, args.drugs, args.group_every)
+    start = time.perf_counter()
+    formatter(ws, grouped_rows, final_sum)
+    formatted = time.perf_counter() - start
+    wb.save(path)
+    saved = time.perf_counter() - start - formatted
+    print(f"  {label:<22} format {formatted:>7.2f}s   save {saved:>7.2f}s   {path.stat().st_size / 1e6:>6.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--drugs", type=int, default=12)
+    parser.add_argument("--group-every", type=int, default=25)
+    args = parser.parse_args()
+
+    print(f"{args.rows} rows x {2 * args.drugs + 6} columns, one optovik row every {args.group_every} rows")
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path, new_path = Path(tmp) / "per_cell.xlsx", Path(tmp) / "range.xlsx"
+        timed("per-cell loop (old)", per_cell_formatting, args, old_path)
+        timed("RangeStyler", range_formatting, args, new_path)
+
+        with zipfile.ZipFile(old_path) as old, zipfile.ZipFile(new_path) as new:
+            parts = ["xl/styles.xml", "xl/worksheets/sheet1.xml"]
+            same = all(old.read(part) == new.read(part) for part in parts)
+        print(f"  styles and sheet xml {'identical' if same else 'DIFFERENT'}")
+
+
+if __name__ == "__main__":
+    main()
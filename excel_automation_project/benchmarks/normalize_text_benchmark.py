@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+# Add the src folder to Python path
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root / "src"))
+
+import argparse
+import time
+import unicodedata
+import numpy as np
+import pandas as pd
+from common.text_normalizer import normalize_text, normalize_unique
+
+# Address normalization on a synthetic column with few distinct values.
+#   python benchmarks/normalize_text_benchmark.py --rows 1000000 --distinct 5000
+
+
+def make_address_column(rows, distinct):
+    rng = np.random.default_rng(42)
+    streets = ["ул. Навои", "пр-т Амира Темура", "м-в «Юнусабад»", "Chilonzor tumani", "ул. Бобура,"]
+    cities = ["г. Ташкент", "Андижан", "Самарканд — центр", "NAMANGAN SH.", "Фергана"]
+    values = [
+        f"  {cities[i % len(cities)]}, {streets[(i // len(cities)) % len(streets)]} {i}-уй  "
+        for i in range(distinct)
+    ]
+    return pd.Series(np.array(values, dtype=object)[rng.integers(0, distinct, rows)])
+
+
+def per_row_original(text):
+    text = text.strip().lower()
+    if text:
+        text = unicodedata.normalize('NFKC', text)
+        text = ''.join(ch for ch in text if not unicodedata.category(ch).startswith('P'))
+    return text
+
+
+def timed(label, func, baseline=None):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    same = "" if baseline is None else ("  identical" if result.equals(baseline) else "  DIFFERENT")
+    print(f"  {label:<28} {elapsed:>8.2f}s{same}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--distinct", type=int, default=5000)
+    args = parser.parse_args()
+
+    addresses = make_address_column(args.rows, args.distinct)
+    print(f"{args.rows} rows, {addresses.nunique()} distinct addresses")
+
+    baseline = timed("per-row apply (old)", lambda: addresses.apply(per_row_original))
+    normalize_text.cache_clear()
+    timed("unique values, cold cache", lambda: normalize_unique(addresses), baseline)
+    timed("unique values, warm cache", lambda: normalize_unique(addresses), baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ from openpyxl import load_workbook
 from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
 from common.config_handler import config
+from common.excel_styles import RangeStyler, NUMBER
 from common.error_handler import error_manager, ExpectedCustomError
 
 class Processing_1c_source:
@@ -150,9 +151,7 @@ class Processing_1c_source:
             self.new_ws.merge_cells(start_row=1,end_row=1,start_column=cell,end_column=cell+1)
 
         # number formating cells
-        for row in self.new_ws.iter_rows(min_row=3, max_row=self.new_ws.max_row, min_col=4, max_col=self.new_ws.max_column):
-            for cell in row:
-                cell.number_format = '_(* #,##0.00_);_(* -#,##0.00_);_(* "-"??_);_(@_)'
+        RangeStyler(self.new_ws).apply(NUMBER, 3, self.new_ws.max_row, 4, self.new_ws.max_column)
 
     def save_workbook(self):
         try:
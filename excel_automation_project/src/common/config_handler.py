@@ -1,12 +1,189 @@
 import json
 from pathlib import Path
-from typing import Dict
 import sys
 from common.error_handler import error_manager, ExpectedCustomError
 
+
+# SETTING RESOLVERS: (raw config.json dict, project root) -> value, raising the setting's error
+def _path(key):
+    def resolve(raw, root) -> Path:
+        value = raw.get(key)
+        if not value:
+            raise ExpectedCustomError(
+                f"❌ Config key '{key}' missing or empty in config.json.\n"
+                f"\n📌 HOW TO FIX:\n"
+                f"1. Open 'config/config.json'.\n"
+                f"2. Add or set '{key}' to a valid relative path string.\n"
+                f"3. Save and restart the application."
+            )
+        return root / value
+    return resolve
+
+def _required(key, description):
+    def resolve(raw, root):
+        value = raw.get(key)
+        if value is None:
+            raise ExpectedCustomError(
+                f"\n❌ Config key '{key}' for {description} is missing.\n"
+                f"\n📌 HOW TO FIX:\n"
+                f"- Add '{key}' in config.json with a valid string."
+            )
+        return value
+    return resolve
+
+def _get(key, default=None):
+    return lambda raw, root: raw.get(key, default)
+
+def _column_index(key, default):
+    # config columns are 1 based, df is 0 based
+    def resolve(raw, root):
+        value = raw.get(key, default)
+        try:
+            return value - 1
+        except (TypeError, ValueError):
+            # only this setting fails, when it is used
+            raise ExpectedCustomError(
+                f"❌ Config key '{key}' must be a column number, got {value!r}.\n"
+                f"\n📌 HOW TO FIX:\n"
+                f"- Set '{key}' in config.json to a whole number (1 = first column)."
+            )
+    return resolve
+
+def _database_conn_string(raw, root) -> str:
+    conn = raw.get("database_connection_string")
+    if not conn:
+        raise ExpectedCustomError(
+            f"❌ 'database_connection_string' not set in config.json.\n"
+            f"\n📌 HOW TO FIX:\n"
+            f"1. Add 'database_connection_string' with your DB URI.\n"
+        )
+    return conn
+
+def _bulk_insert_dir(raw, root) -> Path:
+    # optional: folder shared with SQL Server for the 'bulk_insert' loader
+    value = raw.get("bulk_insert_dir")
+    return root / value if value else None
+
+def _path_for_po_gorodom(raw, root) -> Path:
+    # created by the region exporter when it writes there, not on every config load
+    return _path("path_for_po_gorodom")(raw, root) / "po_gorodom"
+
+
+# attribute name -> resolver, compiled once; every load runs each resolver exactly once
+_SETTINGS = {
+    # DATABASE CONNECTION
+    "database_conn_string": _database_conn_string,
+    "fact_bulk_loader": _get("fact_bulk_loader", "fast_executemany"),
+    "bulk_insert_dir": _bulk_insert_dir,
+
+    # 1c path
+    "source_path_for_1c": _path("source_path_for_1c"),
+    "path_for_1c_pivoted": _path("path_for_1c_pivoted"),
+    "path_for_1c_optovik": _path("path_for_1c_optovik"),
+    "sheet_name_1c": _get("1c_data_sheet_name", "Shayana"),
+
+    # PATHS
+    "source_path_for_optiviks": _path("optiviks_source_path"),
+    "source_path_for_dictionary": _path("dictionary_path"),
+    "path_for_vtorichka": _path("path_for_vtorichka"),
+    "source_path_drug_groups": _path("source_path_drug_groups"),
+    "path_for_regions_manual_correction": _path("regions_manual_correction"),
+    "regions_to_be_corrected": _path("regions_to_be_corrected"),
+    "duplicate_clients": _path("duplicate_clients"),
+    "path_for_region_js": _path("path_for_region_js"),
+    "path_for_teritory_js": _path("path_for_teritory_js"),
+    "path_for_budget_difference": _path("budget_difference_path"),
+    "path_for_unmatched_drugs_txt": _path("path_for_unmatched_drugs_txt"),
+    "path_for_po_gorodom": _path_for_po_gorodom,
+
+    # //////////////////////////////////////
+    "database_region_match_bool": _required("region_matching_from_database", "boolean value for the database matching to fill regions"),
+    "excel_cache_enabled": _get("excel_cache_enabled", True),
+    "excel_cache_dir": lambda raw, root: root / raw.get("excel_cache_dir", "data/cache"),
+    "customer_cache_path": lambda raw, root: root / raw.get("customer_cache_path", "data/cache/dim_customer.sqlite"),
+    # 1 = read workbooks one after another, >1 = process pool
+    "excel_read_workers": _get("excel_read_workers", 1),
+    # 1 = resolve regions/territories sheet by sheet, >1 = process pool
+    "territory_workers": _get("territory_workers", 1),
+    # True = DataManager keeps optovik labels as shared categoricals and lossless float32 values
+    "typed_frames": _get("typed_frames", False),
+    # True = one groupby/unstack for all optovik sheets, False = pivot_table per sheet
+    "batch_pivot": _get("batch_pivot", True),
+    # "streaming" = write-only renderer, "openpyxl" = to_excel + OutlineAndFormulas
+    "report_writer": _get("report_writer", "streaming"),
+    # 1 = write regional files one after another, >1 = process pool
+    "region_export_workers": _get("region_export_workers", 1),
+    # 1 = build the stage-1 product group tables one after another, >1 = process pool
+    "stage_workers": _get("stage_workers", 1),
+    "incremental_etl": _get("incremental_etl", False),
+    # "queued" = log calls only enqueue, a listener thread writes errors.log; "direct" = write per call
+    "log_mode": _get("log_mode", "direct"),
+    # JSON run reports (and stage profiles) of etl_main / vt_main / 1c_main
+    "run_report_dir": lambda raw, root: root / raw.get("run_report_dir", "data/run_reports"),
+    # "" = off, "cprofile" / "pyinstrument" = dump a profile of every top-level stage
+    "profile_stages": _get("profile_stages", ""),
+    "reserve_column_values_list": _get("reserve_column_values_list"),
+
+    "vtorichka_sheet_name": _get("vtorichka_sheet_name", "Вторичка"),
+    "main_header_name": _get("main_header_name_for_client_info", "Данные клиентов"),
+    "client_header_name": _get("header_name_for_clients", "Клиент"),
+    "region_header_name": _get("header_name_for_region", "Регион"),
+    "territory_header_name": _get("header_name_for_territory", "Территори"),
+    "quantity_header_name": _get("header_name_for_quantity", "Количество"),
+    "total_sales_header_name": _get("header_name_for_total_sales", "Сумма продажи"),
+    "total_header_name": _get("header_name_for_total", "Итого"),
+    "drugs_header_name": _get("header_name_for_drugs", "Препарат"),
+    "price_header_name": _get("header_name_for_price", "Сумма с наценкой"),
+    "reserve_header_name": _get("header_name_for_reserve", "Резерв"),
+    "date_header_name": _get("header_name_date", "Дата"),
+    "ungroup_drugs_header_name": _get("header_name_for_ungroup_drugs", "Others"),
+    "oblast_header_name": _get("header_nmae_for_oblast", "Область"),
+    "address_header_name": _get("header_nmae_for_address", "Адрес"),
+
+    # drug name dictionary
+    "dict_cust_drug_names_index": _column_index("dictionary_customer_drug_names_column", 1),
+    "dict_std_drug_names_index": _column_index("dictionary_standart_drug_names_column", 2),
+    "cust_drug_names": _get("dictionary_cust_drug_names", "cust_drug_names"),
+    "std_drug_names": _get("dictionary_std_drug_names", "std_drug_names"),
+
+    # optiviks column index
+    "optivik_drug_col_index": _column_index("optivik_drug_col", 1),
+    "optivik_customer_col_index": _column_index("optivik_customer_col", 2),
+    "optivik_region_col_index": _column_index("optivik_region_col", 3),
+    "optivik_territory_col_index": _column_index("optivik_territory_col", 4),
+    "optivik_quantity_col_index": _column_index("optivik_quantity_col", 5),
+    "optivik_price_col_index": _column_index("optivik_price_col", 6),
+    "optivik_reserve_col_index": _column_index("reserve_text_col", 7),
+    "optivik_month_year_col_index": _column_index("optivik_month_year_col", 8),
+
+    "budget_dif_drugs_col_index": _column_index("budget_difference_drugs_col", 1),
+    "budget_dif_vtorichka_col_index": _column_index("budget_difference_vtorichka_col", 2),
+    "budget_dif_by_region_index": _column_index("budget_difference_by_region", 3),
+
+    "budg_dif_drugs": _get("budg_dif_drugs", "dif_drugs"),
+    "budg_dif_vtorich": _get("budg_dif_vtorich", "by_vtorichka"),
+    "budg_dif_by_reg": _get("budg_dif_by_reg", "by_region"),
+
+    "final_sum_minus": lambda raw, root: 100 - raw.get("final_sum_minus_percent", 10),
+    "final_sum_leksiya": _get("final_sum_for_leksiya_percent", 2),
+
+    # FINAL SUM
+    "final_sum": _get("final_sum", "FINAL SUM"),
+    "final_sum_minus10": _get("final_sum_minus10", "FINAL SUM ( Minus 10 % )"),
+    "final_sum_reklama": _get("final_sum_reklama", "Final summa for Reklama"),
+    "final_sum_leksiya_text": _get("final_sum_leksiya", "Final summa for Leksiya"),
+}
+
+
 class ConfigHandler:
+    """
+    config/config.json resolved and validated once per load into plain slot attributes,
+    so `config.client_header_name` inside a loop is an attribute read. Read-only;
+    refresh() reloads only when config.json's mtime changed. A setting that fails
+    validation raises its error when it is used, as before.
+    """
+    __slots__ = ("_config", "_config_path", "_mtime", "_errors") + tuple(_SETTINGS)
     _instance = None
-    _config: Dict = None
     
     def __new__(cls):
         if not cls._instance:
@@ -29,9 +206,10 @@ class ConfigHandler:
                         f"4. File path expected: {config_file_path}\n"
                     )
 
-                cls._instance = super(ConfigHandler, cls).__new__(cls)
-                cls._load_config(str(config_file_path))
+                instance = super(ConfigHandler, cls).__new__(cls)
+                instance._load(config_file_path)
                 cls._ensure_data_structure()
+                cls._instance = instance
 
             except ExpectedCustomError:
                 raise  # already formatted, re-raise
@@ -43,20 +221,67 @@ class ConfigHandler:
 
         return cls._instance
     
-    @classmethod
-    def _load_config(cls, config_path):
+    @staticmethod
+    def _read_config(config_path):
         try:
             with open(config_path, 'r', encoding='utf-8') as f:
-                cls._config = json.load(f)
+                return json.load(f)
         except FileNotFoundError:
             raise RuntimeError(f"Config file not found at {config_path}")
-        except json.JSONDecodeError:
+        except json.JSONDecodeError as e:
             raise ExpectedCustomError(
                 f"❌ Invalid JSON format in config file: {e}\n"
                 f"\n📌 How to fix:\n"
                 f"- Check for syntax errors in 'config.json'."
             )
-        
+
+    def _load(self, config_path):
+        # mtime first: an edit made while reading is picked up by the next refresh()
+        mtime = config_path.stat().st_mtime_ns
+        raw = self._read_config(config_path)
+
+        values, errors = {}, {}
+        for name, resolve in _SETTINGS.items():
+            try:
+                values[name] = resolve(raw, self._project_root)
+            except ExpectedCustomError as e:
+                errors[name] = str(e)
+
+        # nothing is replaced until the whole file resolved
+        set_slot = object.__setattr__
+        for name in _SETTINGS:
+            if name in values:
+                set_slot(self, name, values[name])
+            else:
+                try:
+                    object.__delattr__(self, name)  # empty slot -> __getattr__ raises the error
+                except AttributeError:
+                    pass
+        set_slot(self, "_config", raw)
+        set_slot(self, "_config_path", config_path)
+        set_slot(self, "_mtime", mtime)
+        set_slot(self, "_errors", errors)
+
+    def refresh(self) -> bool:
+        """Reload config.json if its mtime changed since the last load; True when it was reloaded"""
+        try:
+            mtime = self._config_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False  # keep the loaded settings
+        if mtime == self._mtime:
+            return False
+        self._load(self._config_path)
+        return True
+
+    def __getattr__(self, name):
+        # only reached for an empty slot: the setting failed validation at load
+        if name in _SETTINGS and name in self._errors:
+            raise ExpectedCustomError(self._errors[name])
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __setattr__(self, name, value):
+        raise AttributeError("config is read-only, edit config/config.json instead")
+
     @classmethod
     def _ensure_data_structure(cls):
         # Define the base 'data' folder
@@ -66,270 +291,6 @@ class ConfigHandler:
         for sub in ["prepared", "to_fix", "final", "1c_files"]:
             (data_folder / sub).mkdir(exist_ok=True)  # Create if missing
 
-    def _get_path(self, key: str) -> Path:
-        raw = self._config.get(key)
-        if not raw:
-            raise ExpectedCustomError(
-                f"❌ Config key '{key}' missing or empty in config.json.\n"
-                f"\n📌 HOW TO FIX:\n"
-                f"1. Open 'config/config.json'.\n"
-                f"2. Add or set '{key}' to a valid relative path string.\n"
-                f"3. Save and restart the application."
-            )
-        return self._project_root / raw
-        
-
-    # DATABASE CONNECTION
-    @property
-    def database_conn_string(self) -> str:
-        conn = self._config.get("database_connection_string")
-        if not conn:
-            raise ExpectedCustomError(
-                f"❌ 'database_connection_string' not set in config.json.\n"
-                f"\n📌 HOW TO FIX:\n"
-                f"1. Add 'database_connection_string' with your DB URI.\n"
-            )
-        return conn
-    
-    # 1c path
-    @property
-    def source_path_for_1c(self) -> Path:
-        return self._get_path("source_path_for_1c")
-    @property
-    def path_for_1c_pivoted(self) -> Path:
-        return self._get_path("path_for_1c_pivoted")
-    @property
-    def path_for_1c_optovik(self) -> Path:
-        return self._get_path("path_for_1c_optovik")
-    @property
-    def sheet_name_1c(self) -> str:
-        return self._config.get("1c_data_sheet_name", "Shayana")
-    
-    # PATHS
-    @property
-    def source_path_for_optiviks(self) -> Path:
-        return self._get_path("optiviks_source_path")
-
-    @property
-    def source_path_for_dictionary(self) -> Path:
-        return self._get_path("dictionary_path")
-
-    @property
-    def path_for_vtorichka(self) -> Path:
-        return self._get_path("path_for_vtorichka")
-
-    @property
-    def source_path_drug_groups(self) -> Path:
-        return self._get_path("source_path_drug_groups")
-    
-    @property
-    def path_for_regions_manual_correction(self) -> Path:
-        return self._get_path("regions_manual_correction")
-    
-    @property
-    def regions_to_be_corrected(self) -> Path:
-        return self._get_path("regions_to_be_corrected")
-    
-    @property
-    def duplicate_clients(self) -> Path:
-        return self._get_path("duplicate_clients")
-
-    @property
-    def path_for_region_js(self) -> Path:
-        return self._get_path("path_for_region_js")
-    
-    @property
-    def path_for_teritory_js(self) -> Path:
-        return self._get_path("path_for_teritory_js")
-
-    @property
-    def path_for_budget_difference(self) -> Path:
-        return self._get_path("budget_difference_path")
-    
-    @property
-    def path_for_unmatched_drugs_txt(self) -> Path:
-        return self._get_path("path_for_unmatched_drugs_txt")
-
-    @property
-    def path_for_po_gorodom(self) -> Path:
-        base_path = Path(self._get_path("path_for_po_gorodom"))
-        folder_path = base_path / "po_gorodom"
-        folder_path.mkdir(parents=True,exist_ok=True)
-        return folder_path
-
-# //////////////////////////////////////
-
-    def _get_value(self, key: str, description: str) -> str:
-        val = self._config.get(key)
-        if val is None:
-            raise ExpectedCustomError(
-                f"\n❌ Config key '{key}' for {description} is missing.\n"
-                f"\n📌 HOW TO FIX:\n"
-                f"- Add '{key}' in config.json with a valid string."
-            )
-        return val
-    
-    @property
-    def database_region_match_bool(self) -> bool:
-        return self._get_value("region_matching_from_database", "boolean value for the database matching to fill regions")
-
-    @property
-    def reserve_column_values_list(self) -> list:
-        return self._config.get("reserve_column_values_list")
-
-
-    @property
-    def vtorichka_sheet_name(self) -> str:
-        return self._config.get("vtorichka_sheet_name", "Вторичка")
-    
-    @property
-    def main_header_name(self) -> str:
-        return self._config.get("main_header_name_for_client_info", "Данные клиентов")
-    
-    @property
-    def client_header_name(self) -> str:
-        return self._config.get("header_name_for_clients", "Клиент")
-    
-    @property
-    def region_header_name(self) -> str:
-        return self._config.get("header_name_for_region", "Регион")
-    
-    @property
-    def territory_header_name(self) -> str:
-        return self._config.get("header_name_for_territory", "Территори")
-    
-    @property
-    def quantity_header_name(self) -> str:
-        return self._config.get("header_name_for_quantity", "Количество")
-    
-    @property
-    def total_sales_header_name(self) -> str:
-        return self._config.get("header_name_for_total_sales", "Сумма продажи")
-    
-    @property
-    def total_header_name(self) -> str:
-        return self._config.get("header_name_for_total", "Итого")
-    
-    @property
-    def drugs_header_name(self) -> str:
-        return self._config.get("header_name_for_drugs", "Препарат")
-    
-    @property
-    def price_header_name(self) -> str:
-        return self._config.get("header_name_for_price", "Сумма с наценкой")
-    @property
-    def reserve_header_name(self) -> str:
-        return self._config.get("header_name_for_reserve", "Резерв")
-    
-    @property
-    def date_header_name(self) -> str:
-        return self._config.get("header_name_date", "Дата")
-    
-    @property
-    def ungroup_drugs_header_name(self) -> str:
-        return self._config.get("header_name_for_ungroup_drugs", "Others")
-        
-    @property
-    def oblast_header_name(self) -> str:
-        return self._config.get("header_nmae_for_oblast", "Область")
-    
-    @property
-    def address_header_name(self) -> str:
-        return self._config.get("header_nmae_for_address", "Адрес")
-
-
-    # drug name dictionary  
-    @property
-    def dict_cust_drug_names_index(self) -> int:
-        return self._config.get("dictionary_customer_drug_names_column", 1) - 1 #df is 0 based
-    
-    @property
-    def dict_std_drug_names_index(self) -> int:
-        return self._config.get("dictionary_standart_drug_names_column", 2) - 1 #df is 0 based
-    
-    @property
-    def cust_drug_names(self) -> str:
-        return self._config.get("dictionary_cust_drug_names", "cust_drug_names")
-    
-    @property
-    def std_drug_names(self) -> str:
-        return self._config.get("dictionary_std_drug_names", "std_drug_names")
-
-
-    # optiviks column index
-    @property
-    def optivik_drug_col_index(self) -> int:
-        return self._config.get("optivik_drug_col", 1) - 1 #df is 0 based
-    @property
-    def optivik_customer_col_index(self) -> int:
-        return self._config.get("optivik_customer_col", 2) - 1 #df is 0 based
-    @property
-    def optivik_region_col_index(self) -> int:
-        return self._config.get("optivik_region_col", 3) - 1 #df is 0 based
-    @property
-    def optivik_territory_col_index(self) -> int:
-        return self._config.get("optivik_territory_col", 4) - 1 #df is 0 based
-    @property
-    def optivik_quantity_col_index(self) -> int:
-        return self._config.get("optivik_quantity_col", 5) - 1 #df is 0 based
-    @property
-    def optivik_price_col_index(self) -> int:
-        return self._config.get("optivik_price_col", 6) - 1 #df is 0 based
-    @property
-    def optivik_reserve_col_index(self) -> int:
-        return self._config.get("reserve_text_col", 7) - 1 #df is 0 based
-    @property
-    def optivik_month_year_col_index(self) -> int:
-        return self._config.get("optivik_month_year_col",  8) - 1 #df is 0 based
-    
-
-    @property
-    def budget_dif_drugs_col_index(self) -> int:
-        return self._config.get("budget_difference_drugs_col", 1) - 1 #df is 0 based
-    @property
-    def budget_dif_vtorichka_col_index(self) -> int:
-        return self._config.get("budget_difference_vtorichka_col", 2) - 1 #df is 0 based
-    @property
-    def budget_dif_by_region_index(self) -> int:
-        return self._config.get("budget_difference_by_region", 3) - 1 #df is 0 based
-    
-
-    @property
-    def budg_dif_drugs(self) -> str:
-        return self._config.get("budg_dif_drugs", "dif_drugs")
-    @property
-    def budg_dif_vtorich(self) -> str:
-        return self._config.get("budg_dif_vtorich", "by_vtorichka")
-    @property
-    def budg_dif_by_reg(self) -> str:
-        return self._config.get("budg_dif_by_reg", "by_region")
-    
-
-
-    
-    @property
-    def final_sum_minus(self) -> int:
-        return 100 - self._config.get("final_sum_minus_percent", 10) 
-
-    @property
-    def final_sum_leksiya(self) -> int:
-        return self._config.get("final_sum_for_leksiya_percent", 2)
-
-
-    # FINAL SUM 
-    @property
-    def final_sum(self) -> str:
-        return self._config.get("final_sum", "FINAL SUM")
-    @property
-    def final_sum_minus10(self) -> str:
-        return self._config.get("final_sum_minus10", "FINAL SUM ( Minus 10 % )")
-    @property
-    def final_sum_reklama(self) -> str:
-        return self._config.get("final_sum_reklama", "Final summa for Reklama")
-    @property
-    def final_sum_leksiya_text(self) -> str:
-        return self._config.get("final_sum_leksiya", "Final summa for Leksiya")
-    
 try:
     config = ConfigHandler()
 except ExpectedCustomError as e:
@@ -0,0 +1,88 @@
+import sys
+from pathlib import Path
+
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+import sqlite3
+from contextlib import closing, contextmanager
+import pandas as pd
+from sqlalchemy import text
+from common.error_handler import error_manager
+
+
+class CustomerLookupCache:
+    """
+    Local SQLite copy of dim_customer (Customer, Region, Territory).
+
+    `refresh` pulls only the rows whose `last_updated` is at or after the newest
+    timestamp already stored, so a run normally transfers a handful of rows instead
+    of one IN-list query per 1000 clients per sheet. Lookups are in-memory joins
+    against the loaded snapshot, which also works when the database is offline.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS dim_customer (
+                    Customer TEXT PRIMARY KEY,
+                    Region TEXT,
+                    Territory TEXT,
+                    last_updated TEXT NOT NULL
+                )
+            """)
+        self.frame = None
+
+    @contextmanager
+    def _connect(self):
+        """One transaction on a connection that is closed afterwards (an open file stays locked on Windows)"""
+        with closing(sqlite3.connect(self.path)) as conn:
+            with conn:
+                yield conn
+
+    def watermark(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT MAX(last_updated) FROM dim_customer").fetchone()[0]
+
+    def refresh(self, engine):
+        """Copy new and changed dim_customer rows; raises SQLAlchemyError when the DB is unreachable"""
+        watermark = self.watermark()
+        query = "SELECT Customer, Region, Territory, last_updated FROM dim_customer"
+        params = {}
+        if watermark:
+            # >= because DATETIME is rounded; re-reading the boundary rows is harmless
+            query += " WHERE last_updated >= :watermark"
+            params["watermark"] = pd.Timestamp(watermark).to_pydatetime()
+        changed = pd.read_sql_query(text(query), engine, params=params)
+
+        if not changed.empty:
+            changed["last_updated"] = pd.to_datetime(changed["last_updated"]).dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+            rows = changed.astype(object).where(changed.notna(), None).itertuples(index=False, name=None)
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO dim_customer (Customer, Region, Territory, last_updated) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+        self.frame = None
+        error_manager.log_info(f"  Customer lookup cache refreshed: {len(changed)} new or changed customers.")
+        return len(changed)
+
+    def load(self):
+        """Snapshot used for lookups (read once per run)"""
+        if self.frame is None:
+            with self._connect() as conn:
+                self.frame = pd.read_sql_query("SELECT Customer, Region, Territory FROM dim_customer", conn)
+        return self.frame
+
+    def __len__(self):
+        return len(self.load())
+
+    def lookup(self, customers):
+        """dim_customer rows of the given customers that are in the cache"""
+        frame = self.load()
+        return frame[frame["Customer"].isin(customers)]
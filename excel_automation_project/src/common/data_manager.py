@@ -1,7 +1,33 @@
+import sys
 from collections import defaultdict
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+from common.config_handler import config
+from common.error_handler import error_manager
+from common.run_profiler import run_profiler
+
+
+def plain_frame(dataframe):
+    """Typed frame -> object labels and float64 values (returned as is when nothing is typed)"""
+    dtypes = {}
+    for col, dtype in dataframe.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            dtypes[col] = object
+        elif dtype == np.float32:
+            dtypes[col] = np.float64
+    return dataframe.astype(dtypes) if dtypes else dataframe
+
 
 class DataManager:
-    def __init__(self):
+    def __init__(self, typed_frames=False):
+        # typed_frames: optovik frames keep their label columns as categoricals over
+        # category sets shared by all sheets, and float32 values where that is lossless
+        self.typed_frames = typed_frames
+        self._categories = {}
+        # container -> last stage that uses it (see plan_stages)
+        self._release_after = {}
+
         self.mapped_optoviks = {}
         self.drug_name_dict = {}
 
@@ -16,19 +42,19 @@ class DataManager:
         self.all_regions_list = set()
         self.all_teritories_list = set()
 
-        self.budget_dict = None
+        self.drug_reference = None
         self.drug_groups_df = None
         self.drug_groups_df_melted = None
 
         
     def add_mapped_optovik(self, sheet_name, dataframe):
-        self.mapped_optoviks[sheet_name] = dataframe
+        self.mapped_optoviks[sheet_name] = self._typed(dataframe)
         
     def add_dictionary(self, sheet_name, dictionary):
         self.drug_name_dict[sheet_name] = dictionary
 
-    def add_budget_dict(self, budget_dict):
-        self.budget_dict = budget_dict
+    def add_drug_reference(self, drug_reference):
+        self.drug_reference = drug_reference
 
     def add_drug_groups_df(self, drug_groups_df):
         self.drug_groups_df = drug_groups_df
@@ -37,7 +63,7 @@ class DataManager:
         self.drug_groups_df_melted = drug_groups_df_melted
 
     def add_final_raw_optoviks(self, sheet_name, dictionary):
-        self.final_raw_optoviks[sheet_name] = dictionary
+        self.final_raw_optoviks[sheet_name] = self._typed(dictionary)
         
     def add_pivoted_optovik(self, sheet_name, dictionary):
         self.pivoted_optoviks[sheet_name] = dictionary
@@ -58,4 +84,146 @@ class DataManager:
         self.all_regions_list.add(value)
 
     def add_all_teritories_list(self, value):
-        self.all_teritories_list.add(value)
\ No newline at end of file
+        self.all_teritories_list.add(value)
+
+
+    # TYPED FRAMES
+    def _label_columns(self):
+        return [config.drugs_header_name, config.client_header_name, config.region_header_name,
+                config.territory_header_name, config.reserve_header_name, "Optoviks"]
+
+    def _typed(self, dataframe):
+        """Label columns -> shared categoricals, quantity/sales -> float32 when lossless. In place, so frames stored twice stay one object."""
+        if not self.typed_frames:
+            return dataframe
+        for col in self._label_columns():
+            if col not in dataframe.columns:
+                continue
+            labels = self._used_labels(dataframe[col])
+            known = self._categories.get(col)
+            if known is None or not labels.isin(known).all():
+                known = self._share_categories(col, labels, dataframe)
+            dataframe[col] = dataframe[col].astype(pd.CategoricalDtype(known))
+
+        for col in [config.quantity_header_name, config.total_sales_header_name]:
+            if col in dataframe.columns and dataframe[col].dtype == np.float64:
+                values = dataframe[col].to_numpy()
+                as_float32 = values.astype(np.float32)
+                if np.array_equal(as_float32.astype(np.float64), values, equal_nan=True):
+                    dataframe[col] = as_float32
+        return dataframe
+
+    @staticmethod
+    def _used_labels(values):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = pd.unique(values.cat.codes.to_numpy())
+            return values.cat.categories.take(codes[codes >= 0])
+        return pd.Index(values.dropna().unique())
+
+    def _share_categories(self, col, labels, dataframe):
+        """
+        Sorted union of `labels` and the labels the stored frames still use; every stored frame
+        moves to it (codes only). Labels overwritten since, like raw territories, drop out.
+        """
+        frames = {id(df): df for container in (self.mapped_optoviks, self.final_raw_optoviks) for df in container.values()}
+        frames.pop(id(dataframe), None)
+        known = labels
+        for df in frames.values():
+            if col in df.columns:
+                known = known.union(self._used_labels(df[col]))
+        known = known.sort_values()
+        for df in frames.values():
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].cat.set_categories(known)
+        self._categories[col] = known
+        return known
+
+    @staticmethod
+    def _frame_bytes(dataframe):
+        # memory_usage(deep=True), but categoricals only count their codes: the category sets are shared
+        usage = dataframe.memory_usage(deep=True, index=True)
+        for col, dtype in dataframe.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                usage[col] = dataframe[col].cat.codes.to_numpy().nbytes
+        return int(usage.sum())
+
+    def frame_footprint(self):
+        """{container: {sheet: bytes}} for every stored optovik frame, plus the shared category sets"""
+        containers = {
+            "mapped_optoviks": self.mapped_optoviks,
+            "final_raw_optoviks": self.final_raw_optoviks,
+            "pivoted_optoviks": self.pivoted_optoviks,
+        }
+        footprint = {
+            name: {sheet: self._frame_bytes(df) for sheet, df in container.items()}
+            for name, container in containers.items()
+        }
+        if self._categories:
+            footprint["shared_categories"] = {
+                col: int(categories.memory_usage(deep=True)) for col, categories in self._categories.items()
+            }
+        return footprint
+
+
+    # STAGE LIFECYCLE
+    def plan_stages(self, stages):
+        """
+        stages: [(stage, consumes, produces), ...] in run order, containers named by attribute.
+        A container is freed when the last stage that consumes it is finished, or right after
+        the stage producing it when no later stage reads it.
+        """
+        self._release_after = {}
+        for stage, consumes, produces in stages:
+            for container in list(produces) + list(consumes):
+                self._release_after[container] = stage
+
+    def finish_stage(self, stage):
+        freed = [container for container, last_stage in self._release_after.items() if last_stage == stage]
+        for container in freed:
+            current = getattr(self, container)
+            if isinstance(current, defaultdict):
+                setattr(self, container, defaultdict(current.default_factory))
+            elif isinstance(current, (dict, list, set)):
+                setattr(self, container, type(current)())
+            else:
+                setattr(self, container, None)
+        if not self.mapped_optoviks and not self.final_raw_optoviks:
+            self._categories = {}
+        report = self.memory_report(stage, freed)
+        # into the record of the open profiler stage
+        run_profiler.annotate(memory_mb=round(sum(report.values()) / 1e6, 1), freed=freed)
+        return report
+
+    def memory_report(self, stage=None, freed=()):
+        """Log memory_usage(deep=True) of every container still holding data; returns {container: bytes}"""
+        footprint = self.frame_footprint()
+        details = {}
+        for container in ["mapped_optoviks", "final_raw_optoviks", "pivoted_optoviks", "shared_categories"]:
+            if footprint.get(container):
+                details[container] = footprint[container]
+        if self.drug_name_dict:
+            details["drug_name_dict"] = {sheet: self._frame_bytes(df) for sheet, df in self.drug_name_dict.items()}
+        for container in ["drug_groups_df", "drug_groups_df_melted"]:
+            if getattr(self, container) is not None:
+                details[container] = {"": self._frame_bytes(getattr(self, container))}
+        for container in ["drug_reference", "total_sheet_data", "all_regions_list", "all_teritories_list"]:
+            if getattr(self, container):
+                details[container] = {"": self._object_bytes(getattr(self, container))}
+
+        report = {container: sum(sizes.values()) for container, sizes in details.items()}
+        title = f"Memory after {stage}" if stage else "Memory"
+        freed_text = f", freed {', '.join(freed)}" if freed else ""
+        error_manager.log_info(f"  {title}: {sum(report.values()) / 1e6:.1f} MB{freed_text}")
+        for container, sizes in details.items():
+            sheets = ", ".join(f"{sheet} {size / 1e6:.1f}" for sheet, size in sizes.items() if sheet)
+            error_manager.log_info(f"    {container}: {report[container] / 1e6:.1f} MB" + (f" ({sheets})" if sheets else ""))
+        return report
+
+    @staticmethod
+    def _object_bytes(value):
+        # plain containers and mappings: the container plus its keys and values, one level deep
+        size = sys.getsizeof(value)
+        items = value.items() if isinstance(value, Mapping) else ((item, None) for item in value)
+        for key, item in items:
+            size += sys.getsizeof(key) + (sys.getsizeof(item) if item is not None else 0)
+        return size
@@ -8,11 +8,16 @@ project_root = current_dir.parent
 # Add project root to Python path
 sys.path.append(str(project_root))
 
+import numpy as np
 import pandas as pd
 from openpyxl import load_workbook
 from common.config_handler import config
 from common.data_manager import DataManager
+from common.drug_name_mapping import DrugNameMapping
+from common.drug_reference import DrugReferenceIndex
+from common.excel_reader import read_workbooks
 from common.error_handler import error_manager, ExpectedCustomError
+from common.run_profiler import run_profiler
 
 class DrugMappingValidator:
     def __init__(self, data_manager, database_date_validation):
@@ -24,16 +29,26 @@ class DrugMappingValidator:
 
             self.dm = data_manager
             self.optoviks = {}
+            # sheet -> DrugNameMapping, and sheet -> (standard names, unmapped mask) of its optovik
+            self._drug_mappings = {}
+            self._resolved_drugs = {}
             self.validation_errors = {
                 "column_count": [], 
                 "mandatory_columns": [],
                 "sheet_names": []
             }
 
-            self.optoviks_sh = pd.ExcelFile(config.source_path_for_optiviks)
-            self.dictionaries = pd.ExcelFile(config.source_path_for_dictionary)
-            self.budg_df = pd.read_excel(config.path_for_budget_difference)
-            self.drug_groups_df = pd.read_excel(config.source_path_drug_groups)
+            # Every workbook is parsed exactly once; validation and cleaning share these frames
+            workbooks = read_workbooks({
+                "optoviks": (config.source_path_for_optiviks, None),
+                "dictionaries": (config.source_path_for_dictionary, None),
+                "budget": (config.path_for_budget_difference, 0),
+                "drug_groups": (config.source_path_drug_groups, 0),
+            }, workers=config.excel_read_workers)
+            self.raw_optoviks = workbooks["optoviks"]
+            self.dictionaries = workbooks["dictionaries"]
+            self.budg_df = workbooks["budget"]
+            self.drug_groups_df = workbooks["drug_groups"]
 
             error_manager.log_info("  Validator initialized successfully")
 
@@ -75,8 +90,7 @@ class DrugMappingValidator:
         """Load source data and drug name dictionaries with cleaning"""
         try:
             error_manager.log_info("Loading optoviks data...")
-            for sheet in self.optoviks_sh.sheet_names:
-                optovik_df = pd.read_excel(self.optoviks_sh, sheet_name=sheet)
+            for sheet, optovik_df in self.raw_optoviks.items():
                 self._validate_optoviks(sheet, optovik_df, 8, self.database_date_validation)
 
             if any(self.validation_errors.values()):
@@ -127,7 +141,7 @@ class DrugMappingValidator:
                     
                 if self.validation_errors['sheet_names']:
                     how_to_fix_sheet_names = (
-                        f"\n\n📄 Available sheets in Drug Dictionary: {self.dictionaries.sheet_names}\n"
+                        f"\n\n📄 Available sheets in Drug Dictionary: {list(self.dictionaries)}\n"
                         "\n\n🛠 HOW TO FIX:\n"
                         "1. Open the Drug Dictionary Excel file.\n"
                         "2. Make sure that **every sheet used in the Optoviks file** exists in the Drug Dictionary file.\n"
@@ -151,8 +165,7 @@ class DrugMappingValidator:
                 raise ExpectedCustomError(error_msg_optovik)
                 
             # LOADING CUSTOMERS DF
-            for sheet in self.optoviks_sh.sheet_names:
-                optovik_df = pd.read_excel(self.optoviks_sh, sheet_name=sheet)
+            for sheet, optovik_df in self.raw_optoviks.items():
                 # changing header names dynamically
                 optovik_df = optovik_df.rename(columns={
                     optovik_df.columns[config.optivik_drug_col_index]: config.drugs_header_name,
@@ -185,7 +198,7 @@ class DrugMappingValidator:
                 optovik_df = optovik_df.drop(config.price_header_name, axis=1)
                 # store data
                 self.optoviks[sheet] = optovik_df
-            error_manager.log_info(f"  Loaded {len(self.optoviks_sh.sheet_names)} optovik sheets successfully")
+            error_manager.log_info(f"  Loaded {len(self.raw_optoviks)} optovik sheets successfully")
         except Exception:
             raise
 
@@ -222,7 +235,7 @@ class DrugMappingValidator:
                     )
 
             # 3 sheet name validation
-            if sheet_name not in self.dictionaries.sheet_names:
+            if sheet_name not in self.dictionaries:
                 self.validation_errors["sheet_names"].append(
                     f"\n\n❌ The sheet '{sheet_name}' exists in the Optoviks file but was not found in the Drug Dictionary Excel file."
                 )
@@ -232,25 +245,24 @@ class DrugMappingValidator:
     def dublicate_client_region_validation(self):
         try:
             error_manager.log_info("Validating client region duplicates...")
-            l = []
+            keys = [config.client_header_name, config.region_header_name, config.territory_header_name]
             for sheet, df in self.optoviks.items():
                 df['Optoviks'] = sheet
-                l.append(df)
-            main_df = pd.concat(l)
-            
-            # Step 1: Group by raw 'client', count unique regions and territories
-            grouped = main_df.groupby(config.client_header_name)[[config.region_header_name, config.territory_header_name]].nunique()
 
-            # Step 2: Keep only clients with more than 1 unique region or territory
-            conflicting_clients = grouped[(grouped[config.region_header_name] > 1) | (grouped[config.territory_header_name] > 1)].index
+            # only the key columns of all sheets, stacked once
+            main_df = pd.concat(
+                [df[['Optoviks'] + keys] for df in self.optoviks.values()], ignore_index=True
+            ) if self.optoviks else pd.DataFrame(columns=['Optoviks'] + keys)
 
-            # Step 3: Filter the original DataFrame
-            result = (
-                main_df[main_df[config.client_header_name].isin(conflicting_clients)]
-                .drop_duplicates(subset=[config.client_header_name, config.region_header_name, config.territory_header_name])
-            )[['Optoviks', config.client_header_name, config.region_header_name, config.territory_header_name]].sort_values(by=config.client_header_name)
-            
-            if not result.empty:
+            # one cross-sheet pass over integer codes: within and across optoviks alike
+            conflicting = self._conflicting_clients(main_df[keys])
+
+            # the report is only built and written when there is a conflict
+            if conflicting.any():
+                result = (
+                    main_df[conflicting]
+                    .drop_duplicates(subset=keys)
+                ).sort_values(by=config.client_header_name)
                 result.to_excel(config.duplicate_clients, index=False)
                 message = (
                     "\n\n" + "=" * 50 + "\nDATA VALIDATION FAILED\n" + "=" * 50 + "\n"
@@ -268,15 +280,31 @@ class DrugMappingValidator:
         except Exception:
             raise
 
+    @staticmethod
+    def _conflicting_clients(key_df):
+        """
+        (client, region, territory) frame -> mask of the rows whose client has more than one
+        region or territory. Every column is hashed once into integer codes (NaN -> -1 and
+        ignored, like nunique); distinct (client, value) pairs are then counted per client.
+        """
+        client_codes, clients = pd.factorize(key_df.iloc[:, 0])
+        # trailing False: code -1 (no client) never conflicts
+        conflicting = np.zeros(len(clients) + 1, dtype=bool)
+        for col in key_df.columns[1:]:
+            value_codes, values = pd.factorize(key_df[col])
+            known = (client_codes >= 0) & (value_codes >= 0)
+            pairs = pd.unique(client_codes[known].astype(np.int64) * len(values) + value_codes[known])
+            conflicting[:-1] |= np.bincount(pairs // max(len(values), 1), minlength=len(clients)) > 1
+        return conflicting[client_codes]
+
     def load_dictionary(self):
         try:
             error_manager.log_info("Loading drug dictionaries...")
-            for sheet in self.dictionaries.sheet_names:
+            for sheet, dict_df in self.dictionaries.items():
                 # if customer not in the optiviks, don't load its dictionary
                 if sheet not in self.optoviks:
                     continue
-                # Load and clean dictionary
-                dict_df = pd.read_excel(config.source_path_for_dictionary, sheet_name=sheet)
+                # Clean dictionary
                 # Remove completely empty rows
                 dict_df = dict_df.dropna(how='all')
 
@@ -303,20 +331,17 @@ class DrugMappingValidator:
                 'missing_standards': {},
                 'duplicates': {}
             }
-            for sheet, df in self.dm.drug_name_dict.items():
+            for sheet in self.dm.drug_name_dict.keys():
+                mapping = self._drug_mapping(sheet)
                 # Check 1: Missing customer drug names
-                missing_names = df[config.cust_drug_names].isna().sum()
-                if missing_names:
-                    errors['missing_names'][sheet] = missing_names
+                if mapping.missing_names:
+                    errors['missing_names'][sheet] = mapping.missing_names
                 # Check 2: Customer names without standards
-                missing_std = df.loc[df[config.cust_drug_names].notna() & df[config.std_drug_names].isna()].shape[0]
-                if missing_std:
-                    errors['missing_standards'][sheet] = missing_std
+                if mapping.missing_standards:
+                    errors['missing_standards'][sheet] = mapping.missing_standards
                 # Check 3: Duplicates (excluding nulls)
-                valid_entries = df.dropna(subset=[config.cust_drug_names])
-                dupes = valid_entries[valid_entries.duplicated(config.cust_drug_names, keep=False)]
-                if not dupes.empty:
-                    errors['duplicates'][sheet] = dupes[config.cust_drug_names].unique().tolist()
+                if mapping.duplicates:
+                    errors['duplicates'][sheet] = mapping.duplicates
             # Error reporting
             if any(errors.values()):
                 error_msg = ["\n\n" + "=" * 50 + "\nDRUG NAME DICTIONARY VALIDATION FAILED\n" + "=" * 50 + "\n"]
@@ -359,23 +384,11 @@ class DrugMappingValidator:
             missing_drugs = {}
             for sheet in self.dm.drug_name_dict.keys():                       
                 try:
-                    optovik_df = self.optoviks[sheet]
-                    # Read and Clean dictionary drug names
-                    dict_df = self.dm.drug_name_dict[sheet]
-                    # Merge with cleaned values
-                    merged = optovik_df.merge(
-                        dict_df,
-                        how='left',
-                        left_on=config.drugs_header_name,     
-                        right_on=config.cust_drug_names        
-                    )
-                    # Check for missing mappings
-                    missing = merged[merged[config.std_drug_names].isna()]
-
-                    if not missing.empty:
-                        # Get original values for reporting
-                        missing_report = merged.loc[missing.index, [config.drugs_header_name]]
-                        missing_drugs[sheet] = list(missing_report[config.drugs_header_name].unique())
+                    # one lookup pass; replacing_drugs_to_standart reuses it
+                    _, unmapped = self._resolve_drugs(sheet)
+                    if unmapped.any():
+                        drugs = self.optoviks[sheet][config.drugs_header_name]
+                        missing_drugs[sheet] = self._drug_mapping(sheet).unmapped(drugs, unmapped)
                 except Exception as e:
                     error_manager.log_exception(f"Error validating unmapped drugs in sheet '{sheet}': {str(e)}")
                     raise
@@ -425,23 +438,33 @@ class DrugMappingValidator:
         try:
             error_manager.log_info("Standardizing drug names...")
             for sheet, optovik_df in self.optoviks.items():
-                # load dictionary
-                dict_df = self.dm.drug_name_dict[sheet]
-                
-                # start replacing
-                drug_map = dict_df.set_index(config.cust_drug_names)[config.std_drug_names]
-                optovik_df[config.drugs_header_name] = optovik_df[config.drugs_header_name].map(drug_map)
+                # start replacing (standard names from the validation lookup)
+                standard_names, _ = self._resolve_drugs(sheet)
+                optovik_df[config.drugs_header_name] = standard_names
 
                 # store it
                 self.optoviks[sheet] = optovik_df
+            # the drug columns hold standard names now, the lookups no longer apply to them
+            self._resolved_drugs = {}
             error_manager.log_info("  Drug names standardized successfully")
         except Exception:
             raise
         
+    def _drug_mapping(self, sheet):
+        if sheet not in self._drug_mappings:
+            self._drug_mappings[sheet] = DrugNameMapping(self.dm.drug_name_dict[sheet])
+        return self._drug_mappings[sheet]
+
+    def _resolve_drugs(self, sheet):
+        """(standard names, unmapped mask) of the sheet's drug column, looked up once"""
+        if sheet not in self._resolved_drugs:
+            drugs = self.optoviks[sheet][config.drugs_header_name]
+            self._resolved_drugs[sheet] = self._drug_mapping(sheet).resolve(drugs)
+        return self._resolved_drugs[sheet]
+
     def load_budget_diff_drug_groups(self):
         try:
             error_manager.log_info("Loading budget difference and drug groups...")
-            budget_dict = {}
             duplicate_errors = []  # Collect all duplicate errors
 
             # READ BUDGET DIFFERENCE
@@ -520,17 +543,13 @@ class DrugMappingValidator:
                 )
                 raise ExpectedCustomError(message)
             
+            drug_groups_df_melted = drug_groups_df_melted.reset_index(drop=True)
+
             # Add cleaned data to data manager
-            # Create budget dictionary
-            a = self.budg_df[config.budg_dif_drugs].tolist()
-            b = self.budg_df[config.budg_dif_vtorich].tolist()
-            c = self.budg_df[config.budg_dif_by_reg].tolist()
-            budget_dict = {drug: (v, r) for drug, v, r in zip(a, b, c)}
-            
-            # Add to data manager
-            self.dm.add_budget_dict(budget_dict)
+            # one read-only reference (budget values + group per drug) for validation and formulas
+            self.dm.add_drug_reference(DrugReferenceIndex.from_frames(self.budg_df, drug_groups_df_melted))
             self.dm.add_drug_groups_df(self.drug_groups_df)
-            self.dm.add_drug_groups_df_melted(drug_groups_df_melted.reset_index(drop=True))
+            self.dm.add_drug_groups_df_melted(drug_groups_df_melted)
             error_manager.log_info("  Budget difference and drug groups loaded successfully")
         except Exception:
             raise
@@ -540,19 +559,14 @@ class DrugMappingValidator:
         try:
             error_manager.log_info("Validating budget difference and drug groups...")
             # Collect all unique drug names from optoviks
-            all_optovik_drugs = set()
-            for sheet, optovik_df in self.optoviks.items():
-                # Clean and collect drug names
-                drugs_series = optovik_df[config.drugs_header_name].dropna().astype(str).str.strip()
-                all_optovik_drugs.update(drugs_series.unique())
-            
-            # Prepare reference drug lists
-            budget_drugs = set(str(key).strip() for key in self.dm.budget_dict.keys())
-            drug_group_drugs = set(self.dm.drug_groups_df_melted['Products_gr'].dropna().astype(str).str.strip().unique())
-            
-            # Identify missing drugs
-            missing_in_budget = sorted(all_optovik_drugs - budget_drugs)
-            missing_in_drug_groups = sorted(all_optovik_drugs - drug_group_drugs)
+            all_optovik_drugs = pd.Index(pd.unique(pd.concat(
+                [optovik_df[config.drugs_header_name].dropna().astype(str).str.strip() for optovik_df in self.optoviks.values()]
+            ))) if self.optoviks else pd.Index([], dtype=object)
+
+            # Identify missing drugs (one isin per reference list)
+            reference = self.dm.drug_reference
+            missing_in_budget = sorted(all_optovik_drugs[~reference.in_budget(all_optovik_drugs)])
+            missing_in_drug_groups = sorted(all_optovik_drugs[~reference.in_groups(all_optovik_drugs)])
             
             # Export to text files if missing drugs exist
             if missing_in_budget or missing_in_drug_groups:
@@ -628,23 +642,52 @@ class DrugMappingValidator:
             error_manager.log_exception(f"Error processing reserve columns: {str(e)}")
             raise
 
-    def process_all(self):
-        try:
-            self.load_optoviks()
-            self.dublicate_client_region_validation()
-            self.load_dictionary()
+    def keep_sheets(self, sheets):
+        """Drop every optovik (and its dictionary) that is not in `sheets`"""
+        sheets = set(sheets)
+        self.optoviks = {sheet: df for sheet, df in self.optoviks.items() if sheet in sheets}
+        self.dm.drug_name_dict = {sheet: df for sheet, df in self.dm.drug_name_dict.items() if sheet in sheets}
+        self._drug_mappings = {sheet: mapping for sheet, mapping in self._drug_mappings.items() if sheet in sheets}
 
-            self.validate_dictionary()
-            self.validate_unmapped_drugs()
-            self.replacing_drugs_to_standart()
-
-            self.load_budget_diff_drug_groups()
-            self.validate_budget_diff_drug_groups()
-
-            self.handling_reserve_columns()
+    def process_all(self, sheet_filter=None):
+        try:
+            with run_profiler.stage("load_optoviks") as stage:
+                self.load_optoviks()
+                self.dublicate_client_region_validation()
+                stage["rows"] = sum(len(df) for df in self.optoviks.values())
+
+            with run_profiler.stage("dictionary_mapping") as stage:
+                self.load_dictionary()
+
+                # incremental runs: sheet_filter(optoviks, dictionaries) -> sheets to process
+                if sheet_filter is not None:
+                    self.keep_sheets(sheet_filter(self.optoviks, self.dm.drug_name_dict))
+
+                self.validate_dictionary()
+                self.validate_unmapped_drugs()
+                self.replacing_drugs_to_standart()
+                stage["rows"] = sum(len(df) for df in self.optoviks.values())
+
+            with run_profiler.stage("budget_and_groups"):
+                self.load_budget_diff_drug_groups()
+                self.validate_budget_diff_drug_groups()
+
+            with run_profiler.stage("reserve_columns"):
+                self.handling_reserve_columns()
+            self.release_frames()
         except Exception:
             raise
 
+    def release_frames(self):
+        """Drop the workbook frames and caches kept for validation; the results live in the DataManager"""
+        self.raw_optoviks = {}
+        self.optoviks = {}
+        self.dictionaries = {}
+        self.budg_df = None
+        self.drug_groups_df = None
+        self._drug_mappings = {}
+        self._resolved_drugs = {}
+
 if __name__ == "__main__":
     try:
         data_manager = DataManager()
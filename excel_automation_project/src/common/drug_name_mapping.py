@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+import numpy as np
+import pandas as pd
+from common.config_handler import config
+
+
+class DrugNameMapping:
+    """
+    One dictionary sheet as a hashed lookup: customer drug name -> standard name.
+
+    Built once per sheet. The dictionary checks are counted while building it, and an
+    optovik drug column is resolved by a single get_indexer pass that gives both the
+    standard names and the unmapped rows.
+    """
+    def __init__(self, dict_df):
+        customer_names = dict_df[config.cust_drug_names]
+        standard_names = dict_df[config.std_drug_names]
+
+        # DICTIONARY CHECKS
+        self.missing_names = int(customer_names.isna().sum())
+        self.missing_standards = int((customer_names.notna() & standard_names.isna()).sum())
+        valid = customer_names.notna().to_numpy()
+        names = customer_names[valid]
+        repeated = names.duplicated(keep=False).to_numpy()
+        self.duplicates = names[repeated].unique().tolist()
+
+        # LOOKUP (first entry of a repeated name; repeats fail validate_dictionary anyway)
+        first = ~names.duplicated(keep="first").to_numpy()
+        self.index = pd.Index(names[first])
+        # trailing NaN so position -1 (not in the dictionary) resolves to a missing name
+        self._standard_names = np.append(standard_names[valid][first].to_numpy(dtype=object), np.nan)
+
+    def resolve(self, drugs):
+        """Series of customer drug names -> (standard names Series, mask of unmapped rows)"""
+        positions = self.index.get_indexer(drugs)
+        standard = pd.Series(self._standard_names[positions], index=drugs.index, name=drugs.name)
+        return standard, standard.isna().to_numpy()
+
+    def unmapped(self, drugs, unmapped_mask):
+        """Unmapped customer drug names in order of first appearance"""
+        return list(pd.unique(drugs[unmapped_mask]))
@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+from collections.abc import Mapping
+from types import MappingProxyType
+import pandas as pd
+from common.config_handler import config
+
+
+class DrugReferenceIndex(Mapping):
+    """
+    Read-only reference data per standard drug: budget values (Вторичка, by region) from the
+    budget difference file and the drug names listed in the drug groups file.
+
+    Built once by the validator and shared with the formula stage. As a Mapping it answers
+    `drug in index` / `index[drug]` -> (vtorichka, by_region) like the old budget dict;
+    bulk membership goes through pd.Index.isin.
+    """
+    __slots__ = ("_budget", "_budget_names", "_group_names")
+
+    def __init__(self, budget, group_drugs):
+        """budget: {drug: (vtorichka, by_region)}, group_drugs: drug names of the drug groups file"""
+        set_slot = object.__setattr__
+        set_slot(self, "_budget", MappingProxyType(dict(budget)))
+        # names as the membership checks compare them: text, stripped
+        set_slot(self, "_budget_names", pd.Index(list(self._budget)).astype(str).str.strip())
+        set_slot(self, "_group_names", pd.Index([drug for drug in group_drugs if pd.notna(drug)]).astype(str).str.strip().unique())
+
+    @classmethod
+    def from_frames(cls, budget_df, drug_groups_melted):
+        """Budget difference frame + melted drug groups (Product_groups, Products_gr)"""
+        budget = zip(
+            budget_df[config.budg_dif_drugs].tolist(),
+            zip(budget_df[config.budg_dif_vtorich].tolist(), budget_df[config.budg_dif_by_reg].tolist())
+        )
+        return cls(budget, drug_groups_melted['Products_gr'].tolist())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DrugReferenceIndex is read-only")
+
+    def __reduce__(self):
+        # slots + read-only setattr: pool workers rebuild it from the budget dict and group names
+        return (type(self), (dict(self._budget), self._group_names.tolist()))
+
+    # MAPPING (budget values per drug)
+    def __getitem__(self, drug):
+        return self._budget[drug]
+
+    def __contains__(self, drug):
+        return drug in self._budget
+
+    def __iter__(self):
+        return iter(self._budget)
+
+    def __len__(self):
+        return len(self._budget)
+
+    # BULK MEMBERSHIP
+    def in_budget(self, drugs):
+        """Boolean array: which of `drugs` (stripped text) have a budget row"""
+        return pd.Index(drugs).isin(self._budget_names)
+
+    def in_groups(self, drugs):
+        """Boolean array: which of `drugs` (stripped text) belong to a product group"""
+        return pd.Index(drugs).isin(self._group_names)
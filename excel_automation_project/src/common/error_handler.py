@@ -8,13 +8,50 @@ project_root = current_dir.parent
 # Add project root to Python path
 sys.path.append(str(project_root))
 
+import atexit
+import json
 import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s | %(message)s'
+LOG_DATEFMT = '%Y-%m-%d %H:%M:%S'
+
+
+class _BatchedFileHandler(logging.FileHandler):
+    """
+    File handler run by the queue listener thread: records are written as they arrive
+    and the file is flushed once the queue is drained, so a burst is one flush.
+    """
+    def __init__(self, filename, records):
+        super().__init__(filename, encoding="utf-8")
+        self._records = records
+
+    def emit(self, record):
+        # StreamHandler.emit without its flush per record
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if self._records.empty():
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """QueueHandler for a listener thread of the same process: no copy or format on the caller"""
+    def prepare(self, record):
+        # a traceback is turned into text now, the rest is formatted by the listener
+        return super().prepare(record) if record.exc_info else record
+
 
 class ErrorHandler:
     
     def __init__(self):
         try:
             self.log_file = "errors.log"
+            self._listener = None
+            self._fork_hook = False
             self._setup_logging()
         except Exception as e:
             # Fallback to console logging if config fails
@@ -28,22 +65,83 @@ class ErrorHandler:
         handler = logging.FileHandler(self.log_file, encoding="utf-8")
         logging.basicConfig(
             level=logging.INFO,
-            format='%(asctime)s | %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S', 
+            format=LOG_FORMAT,
+            datefmt=LOG_DATEFMT, 
             handlers=[handler]
         )
 
+    def start_queue(self):
+        """
+        Queued mode: log calls only put the record on a queue; a QueueListener thread writes
+        them to the log file and flushes per batch. Markers and line format stay the same;
+        log_complete / log_error / log_exception return only once everything is on disk.
+        """
+        if self._listener is not None:
+            return
+        records = queue.SimpleQueue()
+        file_handler = _BatchedFileHandler(self.log_file, records)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATEFMT))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        root.addHandler(_InProcessQueueHandler(records))
+
+        self._listener = QueueListener(records, file_handler)
+        self._listener.start()
+        # drained before logging's own shutdown (atexit runs last registered first)
+        atexit.register(self.stop_queue)
+        if not self._fork_hook and hasattr(os, "register_at_fork"):
+            # forked pool workers have no listener thread: they write directly again
+            # (no fork on Windows: spawned workers re-import and log directly anyway)
+            os.register_at_fork(after_in_child=self._direct_logging)
+            self._fork_hook = True
+
+    def stop_queue(self):
+        """Write out every queued record and go back to direct file writes"""
+        if self._listener is None:
+            return
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+        self._direct_logging()
+
+    def _flush_queue(self):
+        """Write out every queued record before returning; the GUI may stop the process at a marker"""
+        if self._listener is None:
+            return
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.flush()
+        self._listener.start()
+
+    def _direct_logging(self):
+        if self._listener is None:
+            return
+        self._listener = None
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        self._setup_logging()
+
     def log_info(self, info):
         """Log informational messages"""
         logging.info(f"Info: {str(info)}")
 
+    def log_warning(self, warning):
+        """Log recoverable problems (the run goes on, possibly degraded)"""
+        logging.warning(f"Warning: {str(warning)}")
+
     def log_complete(self, info):
         """Log informational messages"""
         logging.info(f"_COMPLETED_: {str(info)}")
+        self._flush_queue()
         
     def log_error(self, error):
         """Log error messages without traceback"""
         logging.error(f"_ERROR_: {str(error)}")
+        self._flush_queue()
       
     def log_exception(self, error: Exception):
         """
@@ -53,6 +151,12 @@ class ErrorHandler:
             error (Exception): The exception to log.
         """
         logging.error("Exception occurred _ERROR_: %s", error, exc_info=error)
+        self._flush_queue()
+
+    def log_stage(self, stage, seconds, **details):
+        """Structured timing record of one pipeline stage: one JSON object per line"""
+        record = {"stage": stage, "seconds": round(seconds, 3), **details}
+        logging.info(f"Stage: {json.dumps(record, ensure_ascii=False)}")
 
 # Global instance for easy access
 error_manager = ErrorHandler()
@@ -0,0 +1,160 @@
+import sys
+from pathlib import Path
+
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+import hashlib
+import json
+import os
+import pandas as pd
+from common.config_handler import config
+
+try:
+    import pyarrow  # noqa: F401  (parquet engine)
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+
+class ExcelCache:
+    """
+    Parsed-input cache for Excel files.
+
+    Every parsed sheet is stored under `cache_dir` as Parquet (pickle when a frame
+    does not survive a Parquet round trip unchanged, e.g. mixed-type columns).
+    Entries are keyed by file path + mtime + size + read options, so editing the
+    source workbook invalidates them and old entries of that file are removed.
+    """
+    def __init__(self, cache_dir, enabled=True):
+        self.cache_dir = Path(cache_dir)
+        self.enabled = enabled
+
+    # KEYS
+    def _source_dir(self, path):
+        path = Path(path).resolve()
+        path_key = hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:10]
+        return self.cache_dir / f"{path.stem}-{path_key}"
+
+    @staticmethod
+    def _stat_key(path):
+        stat = Path(path).stat()
+        return hashlib.sha1(f"{stat.st_mtime_ns}|{stat.st_size}".encode()).hexdigest()[:12]
+
+    @staticmethod
+    def _entry_key(*parts):
+        return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:12]
+
+    # STORAGE
+    def _load(self, entry):
+        for suffix, reader in ((".parquet", pd.read_parquet), (".pkl", pd.read_pickle)):
+            file_path = entry.with_suffix(suffix)
+            if file_path.exists():
+                try:
+                    return reader(file_path)
+                except Exception:
+                    file_path.unlink(missing_ok=True)  # corrupt entry, parse again
+        return None
+
+    def _store(self, entry, df, stat_key):
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        # drop entries of older versions of the same source file
+        for old in entry.parent.iterdir():
+            if not old.name.startswith(stat_key):
+                old.unlink(missing_ok=True)
+
+        tmp_path = entry.with_name(entry.name + f".{os.getpid()}.tmp")
+        if HAS_PARQUET and self._parquet_roundtrip(df, tmp_path):
+            os.replace(tmp_path, entry.with_suffix(".parquet"))
+            return
+        tmp_path.unlink(missing_ok=True)
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, entry.with_suffix(".pkl"))
+
+    @staticmethod
+    def _parquet_roundtrip(df, tmp_path):
+        try:
+            df.to_parquet(tmp_path)
+            back = pd.read_parquet(tmp_path)
+            return back.columns.equals(df.columns) and back.dtypes.equals(df.dtypes) and back.equals(df)
+        except Exception:
+            return False
+
+    def _names_file(self, path, options):
+        return self._source_dir(path) / f"{self._stat_key(path)}-{self._entry_key('sheet_names', options)}.json"
+
+    def _entry_exists(self, entry):
+        return entry.with_suffix(".parquet").exists() or entry.with_suffix(".pkl").exists()
+
+    # PUBLIC
+    def is_cached(self, path, sheet_name=0, **read_kwargs):
+        if not self.enabled:
+            return False
+        source_dir = self._source_dir(path)
+        stat_key = self._stat_key(path)
+        options = sorted(read_kwargs.items())
+        if sheet_name is None:
+            names_file = self._names_file(path, options)
+            if not names_file.exists():
+                return False
+            names = json.loads(names_file.read_text(encoding="utf-8"))
+            return all(self._entry_exists(source_dir / f"{stat_key}-{self._entry_key(name, options)}") for name in names)
+        return self._entry_exists(source_dir / f"{stat_key}-{self._entry_key(sheet_name, options)}")
+
+    def read_excel(self, path, sheet_name=0, **read_kwargs):
+        """pd.read_excel with the cache in front; sheet_name None returns {sheet: df}"""
+        if not self.enabled:
+            return pd.read_excel(path, sheet_name=sheet_name, **read_kwargs)
+
+        source_dir = self._source_dir(path)
+        stat_key = self._stat_key(path)
+        options = sorted(read_kwargs.items())
+
+        if sheet_name is None:
+            names_file = self._names_file(path, options)
+            if names_file.exists():
+                names = json.loads(names_file.read_text(encoding="utf-8"))
+                frames = {name: self._load(source_dir / f"{stat_key}-{self._entry_key(name, options)}") for name in names}
+                if all(df is not None for df in frames.values()):
+                    return frames
+
+            frames = pd.read_excel(path, sheet_name=None, **read_kwargs)
+            for name, df in frames.items():
+                self._store(source_dir / f"{stat_key}-{self._entry_key(name, options)}", df, stat_key)
+            self.remember_sheet_names(path, list(frames), **read_kwargs)
+            return frames
+
+        entry = source_dir / f"{stat_key}-{self._entry_key(sheet_name, options)}"
+        df = self._load(entry)
+        if df is None:
+            df = pd.read_excel(path, sheet_name=sheet_name, **read_kwargs)
+            self._store(entry, df, stat_key)
+        return df
+
+    def remember_sheet_names(self, path, names, **read_kwargs):
+        """Sheet order of a workbook whose sheets were cached one by one"""
+        if not self.enabled:
+            return
+        names_file = self._names_file(path, sorted(read_kwargs.items()))
+        names_file.parent.mkdir(parents=True, exist_ok=True)
+        names_file.write_text(json.dumps(list(names), ensure_ascii=False), encoding="utf-8")
+
+    def cached_frame(self, source_path, tag, builder):
+        """Cache any frame derived from `source_path` (rebuilt when the file changes)"""
+        if not self.enabled or not Path(source_path).exists():
+            return builder()  # builder reports a missing source itself
+
+        stat_key = self._stat_key(source_path)
+        entry = self._source_dir(source_path) / f"{stat_key}-{self._entry_key(tag)}"
+        df = self._load(entry)
+        if df is None:
+            df = builder()
+            self._store(entry, df, stat_key)
+        return df
+
+
+excel_cache = ExcelCache(config.excel_cache_dir, enabled=config.excel_cache_enabled)
@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from common.excel_cache import excel_cache
+
+
+def _read_sheet(path, sheet_name):
+    """Worker task: parse one sheet (or every sheet when sheet_name is None)"""
+    return excel_cache.read_excel(path, sheet_name=sheet_name)
+
+
+def read_workbooks(sources, workers=1):
+    """
+    Parse several Excel workbooks once.
+
+    sources: {key: (path, sheet_name)} - sheet_name None loads all sheets as {sheet: df}.
+    workers: 1 parses serially, >1 spreads whole sheets over a process pool
+             (openpyxl parsing is pure Python, threads would not help).
+    Returns {key: DataFrame or {sheet: DataFrame}} with the original sheet order.
+    """
+    if workers <= 1:
+        return {key: _read_sheet(path, sheet_name) for key, (path, sheet_name) in sources.items()}
+
+    # one task per sheet, so a 20-sheet workbook is parsed by all workers
+    tasks = []
+    results = {}
+    for key, (path, sheet_name) in sources.items():
+        if excel_cache.is_cached(path, sheet_name):
+            # cached frames load faster than a worker process starts
+            results[key] = _read_sheet(path, sheet_name)
+        elif sheet_name is None:
+            results[key] = {}
+            with pd.ExcelFile(path) as xls:
+                sheet_names = xls.sheet_names
+            tasks.extend((key, path, sheet, True) for sheet in sheet_names)
+        else:
+            tasks.append((key, path, sheet_name, False))
+
+    if not tasks:
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        futures = [(key, sheet, all_sheets, pool.submit(_read_sheet, path, sheet)) for key, path, sheet, all_sheets in tasks]
+        for key, sheet, all_sheets, future in futures:
+            if all_sheets:
+                results[key][sheet] = future.result()
+            else:
+                results[key] = future.result()
+
+    for key, (path, sheet_name) in sources.items():
+        if sheet_name is None:
+            excel_cache.remember_sheet_names(path, results[key])
+    return results
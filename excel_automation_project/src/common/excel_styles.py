@@ -0,0 +1,122 @@
+import sys
+from pathlib import Path
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+from copy import copy
+from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
+
+NUMBER_FORMAT = '_(* #,##0.00_);_(* -#,##0.00_);_(* "-"??_);_(@_)'
+
+
+class CellStyle:
+    """
+    A named set of cell attributes, declared once at module level.
+    Attributes left as None are not touched, so a style can be layered over
+    what pandas (or an earlier style) already put on the cell.
+    """
+    def __init__(self, name, font=None, fill=None, border=None, alignment=None, number_format=None):
+        self.name = name
+        self.font = font
+        self.fill = fill
+        self.border = border
+        self.alignment = alignment
+        self.number_format = number_format
+
+    def apply_to(self, cell):
+        if self.font is not None:
+            cell.font = self.font
+        if self.fill is not None:
+            cell.fill = self.fill
+        if self.border is not None:
+            cell.border = self.border
+        if self.alignment is not None:
+            cell.alignment = self.alignment
+        if self.number_format is not None:
+            cell.number_format = self.number_format
+
+    def __repr__(self):
+        return f"CellStyle({self.name!r})"
+
+
+class RangeStyler:
+    """
+    Applies CellStyles to row/column ranges of one worksheet.
+
+    The style array a CellStyle produces only depends on the style the cell already
+    has, so every (current style, CellStyle) pair is resolved once through openpyxl
+    and all other cells just get a copy of the resulting array: no per-cell Font,
+    Alignment or number format objects and no per-cell style registration.
+    """
+    def __init__(self, ws):
+        self.ws = ws
+        self._resolved = {}
+
+    def apply(self, style, min_row, max_row, min_col=None, max_col=None):
+        apply_cell = self.apply_cell
+        for row in self.ws.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col):
+            for cell in row:
+                apply_cell(cell, style)
+
+    def apply_cell(self, cell, style):
+        key = (style, tuple(cell._style or ()))  # new cells have no style array yet
+        style_array = self._resolved.get(key)
+        if style_array is None:
+            style.apply_to(cell)
+            self._resolved[key] = copy(cell._style)
+        else:
+            cell._style = copy(style_array)
+
+
+# COLOURS, BORDERS, FONTS
+HEADER_FILL = PatternFill(start_color="F4ECC5", end_color="F4ECC5", fill_type="solid")
+OPTOVIK_FILL = PatternFill(start_color="FFE4B5", end_color="FFE4B5", fill_type="solid")
+YELLOW_FILL = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+GREEN_FILL = PatternFill(start_color="92D050", end_color="92D050", fill_type="solid")
+
+REPORT_BORDER = Border(
+    left=Side(style='thin', color='CCCC00'),
+    right=Side(style='thin', color='CCCC00'),
+    top=Side(style='thin', color='CCCC00'),
+    bottom=Side(style='thin', color='CCCC00')
+)
+THIN_BORDER = Border(
+    left=Side(style='thin', color='000000'),
+    right=Side(style='thin', color='000000'),
+    top=Side(style='thin', color='000000'),
+    bottom=Side(style='thin', color='000000')
+)
+
+REPORT_FONT = Font(name="Arial", size=7, color="000000")
+REPORT_BOLD_FONT = Font(name="Arial", size=8, bold=True, color="000000")
+REPORT_FINAL_FONT = Font(name="Arial", size=8, italic=True, color="000000")
+BOLD_FONT = Font(bold=True)
+
+CENTER_WRAP = Alignment(horizontal='center', vertical='center', wrap_text=True)
+CENTER = Alignment(horizontal='center', vertical='center')
+LEFT_WRAP = Alignment(horizontal='left', vertical='center', wrap_text=True)
+
+
+# NAMED STYLES
+# Vtorichka / regional report sheets
+REPORT_HEADER = CellStyle("report_header", REPORT_BOLD_FONT, HEADER_FILL, REPORT_BORDER, CENTER_WRAP)
+OPTOVIK_TEXT = CellStyle("optovik_text", REPORT_BOLD_FONT, OPTOVIK_FILL, REPORT_BORDER)
+OPTOVIK_NUMBER = CellStyle("optovik_number", REPORT_FONT, OPTOVIK_FILL, REPORT_BORDER, number_format=NUMBER_FORMAT)
+CLIENT_TEXT = CellStyle("client_text", REPORT_FONT)
+CLIENT_NUMBER = CellStyle("client_number", REPORT_FONT, number_format=NUMBER_FORMAT)
+FINAL_TEXT = CellStyle("final_text", REPORT_FINAL_FONT, HEADER_FILL, REPORT_BORDER)
+FINAL_NUMBER = CellStyle("final_number", REPORT_FINAL_FONT, HEADER_FILL, REPORT_BORDER, number_format=NUMBER_FORMAT)
+
+# Total sheet
+TOTAL_HEADER = CellStyle("total_header", BOLD_FONT, YELLOW_FILL, THIN_BORDER)
+TOTAL_LABEL = CellStyle("total_label", BOLD_FONT, GREEN_FILL, THIN_BORDER, LEFT_WRAP)
+TOTAL_VALUE = CellStyle("total_value", fill=GREEN_FILL, border=THIN_BORDER, number_format=NUMBER_FORMAT)
+TOTAL_FINAL_SUM = CellStyle("total_final_sum", fill=YELLOW_FILL, border=THIN_BORDER, number_format=NUMBER_FORMAT)
+
+# Stage files and plain tables
+HEADER_CENTER = CellStyle("header_center", alignment=CENTER_WRAP)
+NUMBER = CellStyle("number", number_format=NUMBER_FORMAT)
@@ -8,11 +8,13 @@ project_root = current_dir.parent
 sys.path.append(str(project_root))
 
 import pandas as pd
-import re
 import json
+from concurrent.futures import ProcessPoolExecutor
 from common.config_handler import config
-from collections import defaultdict
-import unicodedata
+from common.excel_cache import excel_cache
+from common.territory_matcher import TerritoryMatcher
+from common.text_normalizer import normalize_text, normalize_unique
+from common.customer_cache import CustomerLookupCache
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
 from common.error_handler import error_manager, ExpectedCustomError
@@ -25,24 +27,24 @@ class TerritoryHandler:
         self.database_match_for_regions = config.database_region_match_bool
         self.connection_string = config.database_conn_string
 
-        # DATABASE CONNECTION
+        # DATABASE CONNECTION (through the local dim_customer cache)
         if self.database_match_for_regions:
+            self.customer_cache = CustomerLookupCache(config.customer_cache_path)
             try:
                 self.engine = create_engine(self.connection_string, echo=False)
-
-                with self.engine.connect() as conn:
-                    result = conn.execute(text("SELECT TOP 1 * FROM dim_customer"))
-                    row = result.fetchone()
-                    if row:
-                        error_manager.log_info("Database connection successful, and 'dim_customer' contains data.")
-                        self.use_database_to_map = True
-                    else:
-                        error_manager.log_info("⚠️Database Connection successful, but 'dim_customer' table is empty.")
-                        self.use_database_to_map = False
+                self.customer_cache.refresh(self.engine)
             except SQLAlchemyError as e:
+                # offline: the cached snapshot still fills regions, without database fallback
+                self.engine = None
+                error_manager.log_info("  ❌ Database Connection failed. Regions and territories are filled from the local customer cache only.")
+                error_manager.log_info(f"Error details: {e}")
+
+            if len(self.customer_cache):
+                error_manager.log_info(f"Customer lookup cache ready with {len(self.customer_cache)} customers.")
+                self.use_database_to_map = True
+            else:
+                error_manager.log_info("⚠️Customer lookup cache is empty, 'dim_customer' has no data yet.")
                 self.use_database_to_map = False
-                error_manager.log_info("  ❌ Database Connection failed. Code can not fill region and teritory through database.")
-                error_manager.log_info("Error details:", str(e))
                 
     def _load_region_mapping(self, path):
         """Precompute region normalization mapping"""
@@ -94,12 +96,12 @@ class TerritoryHandler:
             ) from e
 
     def _compile_territory_patterns(self, path):
-        """Precompile regex patterns for territory matching"""
+        """Precompile territory patterns into a TerritoryMatcher"""
         try:
             with open(path, 'r', encoding='utf-8') as f:
                 territory_data = json.load(f)
 
-            patterns = defaultdict(lambda: defaultdict(list))
+            matcher = TerritoryMatcher()
             for region_in_regions, region_d in territory_data.items():
                 for region, teritories_d in region_d.items():
                     self.dm.add_all_regions_list(region)
@@ -107,10 +109,8 @@ class TerritoryHandler:
                         self.dm.add_all_teritories_list(territory)
                         for v_list in variations_list:
                             for v in v_list:
-                                norm_v = self._normalize_text(v)
-                                pattern = re.compile(r"\b" + r"\s+".join(map(re.escape, norm_v.split())) + r"\b", flags=re.IGNORECASE)
-                                patterns[region_in_regions][region].append((pattern, territory))
-            return patterns
+                                matcher.add(region_in_regions, region, territory, self._normalize_text(v))
+            return matcher
 
         except FileNotFoundError:
             raise ExpectedCustomError(
@@ -149,24 +149,16 @@ class TerritoryHandler:
             ) from e
 
 
-    def _normalize_text(self, text):
+    @staticmethod
+    def _normalize_text(text):
         try:
             """Optimized text normalization, removing all ASCII and Unicode punctuation."""
             if isinstance(text, list):
-                return [self._normalize_text(t) for t in text]
+                return [TerritoryHandler._normalize_text(t) for t in text]
             
-            # Strip whitespace and lowercase
-            text = text.strip().lower()
-            if text:
-                # Normalize Unicode forms (e.g., compatibility characters) first
-                text = unicodedata.normalize('NFKC', text)
-                # Remove any character whose Unicode category starts with 'P' (all punctuation)
-                # This catches ASCII punctuation and Unicode punctuation like ‘ ’ “ ” — etc.
-                text = ''.join(
-                    ch for ch in text
-                    if not unicodedata.category(ch).startswith('P')
-                )
-            return text
+            # Strip, lowercase, NFKC and drop every Unicode punctuation character
+            # (memoized, so repeated regions and addresses are normalized once)
+            return normalize_text(text)
         except Exception as e:
             raise RuntimeError(f"Region teritory finder Text normalization failed: {e}")
 
@@ -186,11 +178,16 @@ class TerritoryHandler:
             region_nan_clients = main_dataframe.loc[mask, config.client_header_name]
             unique_keys = region_nan_clients.unique().tolist()
 
+            # Local cache first, the database only for clients the cache does not know
+            cached = self.customer_cache.lookup(unique_keys)
+            cached_keys = set(cached['Customer'])
+            db_keys = [key for key in unique_keys if key not in cached_keys] if self.engine is not None else []
+
             # Chunk processing
             CHUNK_SIZE = 1000
-            existing_chunks = []
-            for start in range(0, len(unique_keys), CHUNK_SIZE):
-                chunk = unique_keys[start:start + CHUNK_SIZE]
+            existing_chunks = [cached]
+            for start in range(0, len(db_keys), CHUNK_SIZE):
+                chunk = db_keys[start:start + CHUNK_SIZE]
                 placeholders = ','.join(f':val{i}' for i in range(len(chunk)))
                 query = text(f"""
                     SELECT Customer, Region, Territory
@@ -201,7 +198,7 @@ class TerritoryHandler:
                 chunk_df = pd.read_sql_query(query, self.engine, params=params)
                 existing_chunks.append(chunk_df)
 
-            existing = pd.concat(existing_chunks, ignore_index=True) if existing_chunks else pd.DataFrame(columns=['Customer', 'Region', 'Territory'])
+            existing = pd.concat(existing_chunks, ignore_index=True)
 
             # Filter out valid Region/Territory
             region_df = existing[existing['Region'].notna() & existing['Region'].str.strip().astype(bool)]
@@ -246,7 +243,7 @@ class TerritoryHandler:
         """Fill missing regions/territories from manually corrected file if exists"""
 
         try:
-            manual_df = pd.read_excel(config.regions_to_be_corrected)
+            manual_df = excel_cache.read_excel(config.regions_to_be_corrected)
 
             # 🔍 Required column names
             required_columns = [config.client_header_name, self.region_col, self.territory_col]
@@ -260,7 +257,6 @@ class TerritoryHandler:
                     f"- {config.client_header_name}\n- {self.region_col}\n- {self.territory_col}\n\n"
                     "➡️ Tip: Check for typos, extra spaces, or formatting issues in the header row."
                 )
-            manual_df = pd.read_excel(config.regions_to_be_corrected)
             manual_df[config.client_header_name] = manual_df[config.client_header_name].astype(str).str.strip()
             manual_df[self.region_col] = manual_df[self.region_col].astype(str).str.strip()
             manual_df[self.territory_col] = manual_df[self.territory_col].astype(str).str.strip()
@@ -303,53 +299,52 @@ class TerritoryHandler:
             raise
 
     
-    def region_territory_writer(self,main_dataframe,region_mapping,territory_patterns,sheet):
-        try:
+    @staticmethod
+    def _resolve_territories(main_dataframe, region_mapping, territory_matcher, sheet):
+        """
+        Region/territory matching of one sheet without database or file access
+        (runs in worker processes too). Returns the frame and its log line.
+        """
+        region_col = config.region_header_name
+        territory_col = config.territory_header_name
 
-            # Vectorized region processing
-            main_dataframe[self.region_col] = (
-                main_dataframe[self.region_col]
-                .apply(lambda x: region_mapping.get(self._normalize_text(x), None))
-                .astype(object)
-            )
-            
-            # Vectorized territory processing
-            def get_territory(row):
-                region = row[self.region_col]
-                address = row[self.territory_col]
-                if pd.isna(region) or pd.isna(address) or region not in territory_patterns:
-                    return (None, None)
-                    
-                norm_addr = self._normalize_text(address)
-                for real_region, patterns in territory_patterns[region].items():
-                    for pattern, territory_str in patterns:
-                        if pattern.search(norm_addr):
-                            return real_region, territory_str
+        # Region processing: normalize each distinct value once
+        regions = normalize_unique(main_dataframe[region_col]).map(region_mapping).astype(object)
+        # unknown regions stay None, as before
+        main_dataframe[region_col] = regions.where(regions.notna(), None)
+
+        # Territory processing: match each distinct (region, address) pair once
+        def get_territory(region, address):
+            if pd.isna(region) or pd.isna(address) or region not in territory_matcher:
                 return (None, None)
+            return territory_matcher.match(region, TerritoryHandler._normalize_text(address))
 
-            main_dataframe[['new_region', self.territory_col]] = (
-                main_dataframe
-                    .apply(get_territory, axis=1, result_type='expand')
-            )
+        pairs = main_dataframe[[region_col, territory_col]]
+        pair_codes = pairs.groupby([region_col, territory_col], sort=False, dropna=False).ngroup().to_numpy()
+        unique_pairs = pairs.drop_duplicates().itertuples(index=False, name=None)
+        matched = pd.DataFrame([get_territory(region, address) for region, address in unique_pairs], dtype=object)
 
-            # only overwrite self.region_col where new_region is not null
-            mask = main_dataframe['new_region'].notna()
-            main_dataframe.loc[mask, self.region_col] = main_dataframe.loc[mask, 'new_region']
-            # drop the helper
-            main_dataframe.drop(columns=['new_region'], inplace=True)
+        main_dataframe['new_region'] = matched[0].to_numpy()[pair_codes] if len(matched) else None
+        main_dataframe[territory_col] = matched[1].to_numpy()[pair_codes] if len(matched) else None
 
-            # calculations 
-            region_nan = main_dataframe[self.region_col].isna().sum()
-            teritory_nan = main_dataframe[self.territory_col].isna().sum()
-            row_count  = len(main_dataframe)
+        # only overwrite region_col where new_region is not null
+        mask = main_dataframe['new_region'].notna()
+        main_dataframe.loc[mask, region_col] = main_dataframe.loc[mask, 'new_region']
+        # drop the helper
+        main_dataframe.drop(columns=['new_region'], inplace=True)
 
-            filled_regions = row_count - region_nan
-            filled_territories = row_count - teritory_nan
+        # calculations 
+        region_nan = main_dataframe[region_col].isna().sum()
+        teritory_nan = main_dataframe[territory_col].isna().sum()
+        row_count  = len(main_dataframe)
 
-             # Log results
-            error_manager.log_info(f"  {sheet}: Filled {filled_regions} regions and {filled_territories} territories VIA WRITER.")
+        filled_regions = row_count - region_nan
+        filled_territories = row_count - teritory_nan
 
+        return main_dataframe, f"  {sheet}: Filled {filled_regions} regions and {filled_territories} territories VIA WRITER."
 
+    def _fill_missing_territories(self, main_dataframe, sheet):
+        try:
             # Step 1: Fill missing from database
             if self.database_match_for_regions and self.use_database_to_map:
                 main_dataframe = self._fill_missings_from_database(main_dataframe, sheet)
@@ -362,7 +357,41 @@ class TerritoryHandler:
             return main_dataframe
         except Exception:
             raise
-            
+
+    def region_territory_writer(self,main_dataframe,region_mapping,territory_matcher,sheet):
+        try:
+            main_dataframe, message = self._resolve_territories(main_dataframe, region_mapping, territory_matcher, sheet)
+            # Log results
+            error_manager.log_info(message)
+            return self._fill_missing_territories(main_dataframe, sheet)
+        except Exception:
+            raise
+
+    def region_territory_writer_all(self, client_frames, region_mapping, territory_matcher, workers=1):
+        """
+        region_territory_writer for {sheet: client frame}, results in sheet order.
+        workers > 1 runs the matching in a process pool; database and manual
+        correction fills stay in this process and the log keeps the sheet order.
+        """
+        if workers <= 1 or len(client_frames) <= 1:
+            return {
+                sheet: self.region_territory_writer(client_df, region_mapping, territory_matcher, sheet)
+                for sheet, client_df in client_frames.items()
+            }
+
+        results = {}
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(client_frames)),
+            initializer=_init_territory_worker,
+            initargs=(region_mapping, territory_matcher),
+        ) as pool:
+            futures = {sheet: pool.submit(_resolve_territories_task, client_df, sheet) for sheet, client_df in client_frames.items()}
+            for sheet, future in futures.items():
+                main_dataframe, message = future.result()
+                error_manager.log_info(message)
+                results[sheet] = self._fill_missing_territories(main_dataframe, sheet)
+        return results
+
     @staticmethod
     def extract_all_missing_values(dataframes):
         try:
@@ -413,3 +442,14 @@ class TerritoryHandler:
             raise RuntimeError(f"extract_all_missing_values method failed: {e}")
 
 
+# PROCESS POOL WORKERS (the mapping and matcher are sent once per worker, not per sheet)
+_worker_state = {}
+
+def _init_territory_worker(region_mapping, territory_matcher):
+    _worker_state["region_mapping"] = region_mapping
+    _worker_state["territory_matcher"] = territory_matcher
+
+def _resolve_territories_task(main_dataframe, sheet):
+    return TerritoryHandler._resolve_territories(
+        main_dataframe, _worker_state["region_mapping"], _worker_state["territory_matcher"], sheet
+    )
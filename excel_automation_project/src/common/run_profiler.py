@@ -0,0 +1,189 @@
+import sys
+from pathlib import Path
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+import cProfile
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from common.config_handler import config
+from common.error_handler import error_manager
+
+try:
+    import resource  # peak RSS on Linux / macOS
+except ImportError:
+    resource = None
+
+try:
+    import psutil  # peak RSS on Windows (installed with the GUI)
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+try:
+    from pyinstrument import Profiler as InstrumentProfiler
+    HAS_PYINSTRUMENT = True
+except ImportError:
+    HAS_PYINSTRUMENT = False
+
+
+def _peak_rss_mb():
+    """High-water mark of this process's resident memory so far (None when unknown)"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    if HAS_PSUTIL:
+        memory = psutil.Process().memory_info()
+        return round(getattr(memory, "peak_wset", memory.rss) / (1024 * 1024), 1)
+    return None
+
+def _children_cpu():
+    # CPU of finished child processes (pool workers once the pool is shut down); 0 on Windows
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+class RunProfiler:
+    """
+    Stage instrumentation of one pipeline run: wall time, CPU time, peak RSS and row count
+    per stage. Stages nest (their parent is recorded); outside a run they do nothing.
+
+    finish() writes the JSON run report to config 'run_report_dir' and one summary line to
+    errors.log. With config 'profile_stages' = "cprofile" or "pyinstrument" every top-level
+    stage is also profiled into a file next to the report.
+    """
+    def __init__(self):
+        self.pipeline = None
+        self.run_id = None
+        self.stages = []
+        self._open = []
+        self._started = None
+
+    def start(self, pipeline):
+        self.pipeline = pipeline
+        self.run_id = f"{pipeline}_{datetime.now():%Y%m%d_%H%M%S}"
+        self.stages, self._open = [], []
+        self._started = (datetime.now(), time.perf_counter(), time.process_time(), _children_cpu())
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """with run_profiler.stage("pivot") as stage: ...; stage["rows"] = n"""
+        record = {"stage": name, "parent": self._open[-1]["stage"] if self._open else None,
+                  "wall_s": None, "cpu_s": None, "children_cpu_s": None, "peak_rss_mb": None, "rows": rows}
+        if self.pipeline is None:
+            yield record
+            return
+
+        self.stages.append(record)
+        self._open.append(record)
+        profile = self._start_profile() if record["parent"] is None else None
+        wall, cpu, children = time.perf_counter(), time.process_time(), _children_cpu()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["wall_s"] = round(time.perf_counter() - wall, 3)
+            record["cpu_s"] = round(time.process_time() - cpu, 3)
+            record["children_cpu_s"] = round(_children_cpu() - children, 3)
+            record["peak_rss_mb"] = _peak_rss_mb()
+            if profile is not None:
+                record["profile"] = self._dump_profile(profile, name)
+            self._open.pop()
+            if record["parent"] is None:
+                details = {key: value for key, value in record.items() if key not in ("stage", "parent", "wall_s")}
+                error_manager.log_stage(name, record["wall_s"], **details)
+
+    def staged(self, name):
+        """Decorator form of stage(): the whole call is one stage"""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def annotate(self, **details):
+        """Extra fields for the innermost open stage (ignored outside a run)"""
+        if self._open:
+            self._open[-1].update(details)
+
+    # PROFILES
+    def _start_profile(self):
+        mode = config.profile_stages
+        if not mode:
+            return None
+        if mode == "pyinstrument" and HAS_PYINSTRUMENT:
+            profile = InstrumentProfiler()
+            profile.start()
+            return profile
+        if mode == "pyinstrument":
+            error_manager.log_info("  pyinstrument is not installed, profiling with cProfile")
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def _dump_profile(self, profile, name):
+        config.run_report_dir.mkdir(parents=True, exist_ok=True)
+        if HAS_PYINSTRUMENT and isinstance(profile, InstrumentProfiler):
+            profile.stop()
+            path = config.run_report_dir / f"{self.run_id}_{name}.html"
+            path.write_text(profile.output_html(), encoding="utf-8")
+        else:
+            profile.disable()
+            path = config.run_report_dir / f"{self.run_id}_{name}.prof"
+            profile.dump_stats(path)
+        return str(path)
+
+    # REPORT
+    def finish(self, status):
+        """JSON run report + summary line in errors.log; returns the report path (None outside a run)"""
+        if self.pipeline is None:
+            return None
+        started_at, wall, cpu, children = self._started
+        report = {
+            "pipeline": self.pipeline,
+            "run_id": self.run_id,
+            "started": started_at.isoformat(timespec="seconds"),
+            "status": status,
+            "wall_s": round(time.perf_counter() - wall, 3),
+            "cpu_s": round(time.process_time() - cpu, 3),
+            "children_cpu_s": round(_children_cpu() - children, 3),
+            "peak_rss_mb": _peak_rss_mb(),
+            "stages": self.stages,
+        }
+        path = config.run_report_dir / f"{self.run_id}.json"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            error_manager.log_info(f"  Run report could not be written: {e}")
+            path = None
+
+        stages = ", ".join(
+            f"{record['stage']} {record['wall_s']:.1f}s" + (f" ({record['error']})" if "error" in record else "")
+            for record in self.stages if record["parent"] is None and record["wall_s"] is not None
+        )
+        error_manager.log_info(
+            f"Run report: {self.pipeline} {status} in {report['wall_s']:.1f}s "
+            f"(cpu {report['cpu_s']:.1f}s, peak RSS {report['peak_rss_mb']} MB) | {stages}"
+            + (f" | {path}" if path else "")
+        )
+        self.pipeline = None
+        return path
+
+
+# Global instance: entry points start/finish a run, library code opens stages
+run_profiler = RunProfiler()
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+import re
+
+
+class TerritoryMatcher:
+    """
+    Territory lookup compiled once from the territory JSON.
+
+    Patterns are kept in one list per region in JSON order (real region -> territory ->
+    variation), so the first pattern that matches wins exactly like the old per-row loop.
+    Every pattern also keeps its longest word as a plain literal: a variation can only
+    match an address that contains all of its words, so a C-level substring test
+    skips almost every regex search.
+    """
+    def __init__(self):
+        # plain dict so the matcher pickles into worker processes
+        self._entries = {}
+
+    def add(self, region_in_regions, real_region, territory, normalized_variation):
+        words = normalized_variation.split()
+        pattern = re.compile(r"\b" + r"\s+".join(map(re.escape, words)) + r"\b", flags=re.IGNORECASE)
+        # casefold on both sides keeps the literal test valid for IGNORECASE matches
+        keyword = max(words, key=len).casefold() if words else ""
+        self._entries.setdefault(region_in_regions, []).append((keyword, pattern, (real_region, territory)))
+
+    def __contains__(self, region):
+        return region in self._entries
+
+    def match(self, region, normalized_address):
+        """(real_region, territory) of the first pattern found in the address, else (None, None)"""
+        folded = normalized_address.casefold()
+        for keyword, pattern, target in self._entries.get(region, ()):
+            if keyword in folded and pattern.search(normalized_address):
+                return target
+        return (None, None)
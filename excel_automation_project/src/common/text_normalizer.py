@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+import unicodedata
+from functools import lru_cache
+
+
+@lru_cache(maxsize=200000)
+def normalize_text(text):
+    """Strip, lowercase, NFKC and remove all ASCII and Unicode punctuation (cached per value)"""
+    text = text.strip().lower()
+    if text:
+        text = unicodedata.normalize("NFKC", text)
+        text = "".join(ch for ch in text if not unicodedata.category(ch).startswith("P"))
+    return text
+
+
+def normalize_unique(series):
+    """Normalize a column through its distinct values; the cache is shared by all sheets"""
+    values = {value: normalize_text(value) for value in series.unique()}
+    return series.map(values)
+
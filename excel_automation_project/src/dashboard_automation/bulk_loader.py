@@ -0,0 +1,186 @@
+import sys
+from pathlib import Path
+
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+import os
+import re
+import tempfile
+import time
+import uuid
+from abc import ABC, abstractmethod
+from common.config_handler import config
+from common.error_handler import error_manager, ExpectedCustomError
+
+
+# table / column names are put into the SQL text: plain (temp) identifiers only
+_IDENTIFIER = re.compile(r"#{0,2}[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?")
+
+
+class BulkLoader(ABC):
+    """
+    Base class for staging-table loaders.
+
+    Every backend writes a DataFrame into an existing table on the given SQLAlchemy
+    connection (temp tables stay visible because the same session is used), then
+    logs and keeps the throughput it achieved in `last_stats`.
+    """
+    name = None
+
+    def __init__(self, chunk_size=10000):
+        self.chunk_size = chunk_size
+        self.last_stats = None
+
+    def load(self, conn, table_name, df, columns=None):
+        columns = list(columns) if columns is not None else list(df.columns)
+        for name in [table_name] + columns:
+            self._check_identifier(name)
+        start = time.perf_counter()
+        rows = self._load(conn, table_name, df[columns], columns) if len(df) else 0
+        elapsed = time.perf_counter() - start
+        rate = rows / elapsed if elapsed > 0 else float(rows)
+
+        self.last_stats = {
+            "backend": self.name,
+            "table": table_name,
+            "rows": rows,
+            "seconds": round(elapsed, 4),
+            "rows_per_second": round(rate, 1),
+        }
+        error_manager.log_info(f"    [{self.name}] {rows} rows -> {table_name} in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+        return rows
+
+    @abstractmethod
+    def _load(self, conn, table_name, df, columns):
+        """Write df[columns] into table_name; returns the number of rows written"""
+
+    # HELPERS
+    @staticmethod
+    def _check_identifier(name):
+        if not isinstance(name, str) or not _IDENTIFIER.fullmatch(name):
+            raise ExpectedCustomError(f"❌ Bulk loader got an invalid table or column name: {name!r}")
+
+    @staticmethod
+    def _rows(df):
+        """Plain Python tuples with None for NaN (what every DBAPI driver accepts)"""
+        return list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+
+    @staticmethod
+    def _placeholder(conn):
+        paramstyle = conn.dialect.paramstyle
+        if paramstyle == "qmark":
+            return "?"
+        if paramstyle in ("format", "pyformat"):
+            return "%s"
+        raise ExpectedCustomError(f"❌ Bulk loader does not support the '{paramstyle}' driver parameter style.")
+
+
+class FastExecutemanyLoader(BulkLoader):
+    """pyodbc executemany with fast_executemany (parameter array in one round trip)"""
+    name = "fast_executemany"
+
+    def _load(self, conn, table_name, df, columns):
+        placeholders = ", ".join([self._placeholder(conn)] * len(columns))
+        sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+
+        cursor = conn.connection.cursor()
+        try:
+            # only pyodbc has the switch, other drivers use their plain executemany
+            if hasattr(cursor, "fast_executemany"):
+                cursor.fast_executemany = True
+            for start in range(0, len(df), self.chunk_size):
+                cursor.executemany(sql, self._rows(df.iloc[start:start + self.chunk_size]))
+        finally:
+            cursor.close()
+        return len(df)
+
+
+class MultiRowValuesLoader(BulkLoader):
+    """Chunked multi-row INSERT ... VALUES (...), (...) statements"""
+    name = "multi_values"
+
+    # SQL Server: max 1000 row constructors and 2100 parameters per statement
+    MAX_ROWS_PER_STATEMENT = 1000
+    MAX_PARAMS_PER_STATEMENT = 2000
+
+    def _load(self, conn, table_name, df, columns):
+        placeholder = self._placeholder(conn)
+        row_sql = "(" + ", ".join([placeholder] * len(columns)) + ")"
+        rows_per_statement = max(1, min(self.MAX_ROWS_PER_STATEMENT, self.MAX_PARAMS_PER_STATEMENT // len(columns)))
+
+        rows = self._rows(df)
+        cursor = conn.connection.cursor()
+        try:
+            for start in range(0, len(rows), rows_per_statement):
+                chunk = rows[start:start + rows_per_statement]
+                sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES " + ", ".join([row_sql] * len(chunk))
+                cursor.execute(sql, [value for row in chunk for value in row])
+        finally:
+            cursor.close()
+        return len(rows)
+
+
+class CsvBulkInsertLoader(BulkLoader):
+    """
+    Writes a UTF-8 CSV file and loads it with SQL Server BULK INSERT (bcp-style).
+
+    The folder must be readable by the SQL Server service account, so on a remote
+    server point `bulk_insert_dir` in config.json to a shared folder.
+    """
+    name = "bulk_insert"
+
+    def __init__(self, chunk_size=10000, directory=None):
+        super().__init__(chunk_size)
+        self.directory = Path(directory) if directory else Path(tempfile.gettempdir())
+
+    def _load(self, conn, table_name, df, columns):
+        if conn.dialect.name != "mssql":
+            raise ExpectedCustomError(
+                f"❌ The '{self.name}' bulk loader needs SQL Server, current database is '{conn.dialect.name}'.\n"
+                f"\n📌 HOW TO FIX:\n"
+                f"- Set 'fact_bulk_loader' in config.json to 'fast_executemany' or 'multi_values'."
+            )
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        csv_path = self.directory / f"{table_name.lstrip('#')}_{uuid.uuid4().hex}.csv"
+        try:
+            df.to_csv(csv_path, index=False, header=True, encoding="utf-8", lineterminator="\n")
+            # the path is a string literal in the statement: quotes doubled
+            source = str(csv_path).replace("'", "''")
+            conn.exec_driver_sql(f"""
+                BULK INSERT {table_name}
+                FROM '{source}'
+                WITH (FORMAT = 'CSV', FIRSTROW = 2, CODEPAGE = '65001',
+                      FIELDTERMINATOR = ',', ROWTERMINATOR = '0x0a',
+                      KEEPNULLS, TABLOCK, BATCHSIZE = {self.chunk_size})
+            """)
+        finally:
+            if csv_path.exists():
+                os.remove(csv_path)
+        return len(df)
+
+
+BULK_LOADERS = {
+    FastExecutemanyLoader.name: FastExecutemanyLoader,
+    MultiRowValuesLoader.name: MultiRowValuesLoader,
+    CsvBulkInsertLoader.name: CsvBulkInsertLoader,
+}
+
+
+def get_bulk_loader(name=None):
+    """Build the loader selected in config.json ('fact_bulk_loader')"""
+    name = name or config.fact_bulk_loader
+    if name not in BULK_LOADERS:
+        raise ExpectedCustomError(
+            f"❌ Unknown bulk loader '{name}' in config.json.\n"
+            f"\n📌 HOW TO FIX:\n"
+            f"- Set 'fact_bulk_loader' to one of: {', '.join(BULK_LOADERS)}"
+        )
+    if name == CsvBulkInsertLoader.name:
+        return CsvBulkInsertLoader(directory=config.bulk_insert_dir)
+    return BULK_LOADERS[name]()
@@ -10,70 +10,102 @@ sys.path.append(str(project_root))
 
 from common.config_handler import config
 from common.error_handler import error_manager, ExpectedCustomError
+from common.run_profiler import run_profiler
 from common.data_manager import DataManager
 from common.drug_mapping_validator import DrugMappingValidator
 from common.region_teritory_finder import TerritoryHandler
 from dashboard_automation.new_database_etl import SalesDataWarehouse
+from dashboard_automation.etl_manifest import SheetManifest
 
 def process_all_tasks():
-    data_manager = DataManager()
+    # INCREMENTAL LOAD: skip optovik sheets unchanged since the last load
+    manifest = SheetManifest() if config.incremental_etl else None
+    try:
+        if populate_database(DataManager(), manifest) and manifest:
+            # only once the fact load went through
+            manifest.commit()
+    finally:
+        if manifest:
+            manifest.dispose()
+
+
+def populate_database(data_manager, manifest):
+    """Validation, territories and the database load; False when no sheet had to be loaded"""
     #-VALIDATION 
-    validator = DrugMappingValidator(data_manager, True)    
-    validator.process_all()
-    error_manager.log_info("Validation processes completed successfully.\n")
+    with run_profiler.stage("validation") as stage:
+        validator = DrugMappingValidator(data_manager, True)    
+        validator.process_all(sheet_filter=manifest.changed_sheets if manifest else None)
+        stage["rows"] = sum(len(df) for df in data_manager.mapped_optoviks.values())
+        error_manager.log_info("Validation processes completed successfully.\n")
+
+    if not data_manager.mapped_optoviks:
+        error_manager.log_info("No optovik sheet changed since the last load, nothing to populate.")
+        return False
 
     # REGION AND TERITORY FINDING
-    # load teritory json
-    error_manager.log_info("Region and territory identification process...")
-    territory_handler = TerritoryHandler(data_manager)
-    region_mapping = territory_handler._load_region_mapping(config.path_for_region_js)
-    territory_patterns = territory_handler._compile_territory_patterns(config.path_for_teritory_js)
-
-    for sheet,optovik_df in data_manager.mapped_optoviks.items():
-        # Process territories 
-        client_data = optovik_df[[config.client_header_name, config.region_header_name, config.territory_header_name]].copy()
-        territory_processed = territory_handler.region_territory_writer(client_data,region_mapping,territory_patterns,sheet)
-        
-        
-        optovik_df[[config.client_header_name, config.region_header_name, config.territory_header_name]] = territory_processed
-
-        # STORE DATA
-        data_manager.add_final_raw_optoviks(sheet,optovik_df)
-
-    # AFTER PROCESSING ALL DATAFRAMES: Extract any still-missing values
-    has_missing = TerritoryHandler.extract_all_missing_values(data_manager.final_raw_optoviks)
-    if has_missing:
-        raise ExpectedCustomError(
+    with run_profiler.stage("territories") as stage:
+        # load teritory json
+        error_manager.log_info("Region and territory identification process...")
+        territory_handler = TerritoryHandler(data_manager)
+        region_mapping = territory_handler._load_region_mapping(config.path_for_region_js)
+        territory_matcher = territory_handler._compile_territory_patterns(config.path_for_teritory_js)
+
+        # Process territories (config 'territory_workers' > 1 spreads the sheets over processes)
+        client_frames = {
+            sheet: optovik_df[[config.client_header_name, config.region_header_name, config.territory_header_name]].copy()
+            for sheet, optovik_df in data_manager.mapped_optoviks.items()
+        }
+        territory_processed = territory_handler.region_territory_writer_all(client_frames, region_mapping, territory_matcher, config.territory_workers)
+
+        for sheet,optovik_df in data_manager.mapped_optoviks.items():
+            optovik_df[[config.client_header_name, config.region_header_name, config.territory_header_name]] = territory_processed[sheet]
+
+            # STORE DATA
+            data_manager.add_final_raw_optoviks(sheet,optovik_df)
+
+        stage["rows"] = sum(len(df) for df in data_manager.final_raw_optoviks.values())
+        # AFTER PROCESSING ALL DATAFRAMES: Extract any still-missing values
+        has_missing = TerritoryHandler.extract_all_missing_values(data_manager.final_raw_optoviks)
+        if has_missing:
+            raise ExpectedCustomError(
             
-        "\n⚠️ WARNING: Some territories are still missing after automated filling."
-        "\n\n📁 A file has been created at:"
-        f"\n{config.path_for_regions_manual_correction}"
-        "\n\nThis file contains the list of clients with missing Region or Territory information."
-        "\n\n📌 HOW TO FIX:"
-        "\n1. Open the Excel file above and manually fill in the missing **Region** and **Territory** values for each client."
-        f"\n2. Save the file with the following exact name: {config.regions_to_be_corrected}"
-        "\n3. Move the file to the 'prepared' folder inside your project directory: /data/prepared/"
-        "\n4. After completing the above steps, re-run the script."
-
-        "\n\nOnce these corrections are applied, the script will continue processing automatically."
-        )
-    else:
-        error_manager.log_info("All territories successfully processed with no missing values\n")
+            "\n⚠️ WARNING: Some territories are still missing after automated filling."
+            "\n\n📁 A file has been created at:"
+            f"\n{config.path_for_regions_manual_correction}"
+            "\n\nThis file contains the list of clients with missing Region or Territory information."
+            "\n\n📌 HOW TO FIX:"
+            "\n1. Open the Excel file above and manually fill in the missing **Region** and **Territory** values for each client."
+            f"\n2. Save the file with the following exact name: {config.regions_to_be_corrected}"
+            "\n3. Move the file to the 'prepared' folder inside your project directory: /data/prepared/"
+            "\n4. After completing the above steps, re-run the script."
 
-    # DATABASE INSERT ETL
+            "\n\nOnce these corrections are applied, the script will continue processing automatically."
+            )
+        else:
+            error_manager.log_info("All territories successfully processed with no missing values\n")
 
-    error_manager.log_info("Populating the database with new data ...")
-    db_insert = SalesDataWarehouse()
-    db_insert.run_etl(data_manager.final_raw_optoviks,data_manager.drug_groups_df_melted)
+    # DATABASE INSERT ETL
+    with run_profiler.stage("db_load") as stage:
+        error_manager.log_info("Populating the database with new data ...")
+        db_insert = SalesDataWarehouse()
+        stage["rows"] = sum(len(df) for df in data_manager.final_raw_optoviks.values())
+        db_insert.run_etl(data_manager.final_raw_optoviks,data_manager.drug_groups_df_melted)
+    return True
 
 
 def main():
     try:
+        if config.log_mode == "queued":
+            error_manager.start_queue()
+        run_profiler.start("etl_main")
         process_all_tasks()
+        run_profiler.finish("completed")
         error_manager.log_complete(f"ALL ETL PROCESSES COMPLETED SUCCESSFULY.")
     except ExpectedCustomError as e:
+        run_profiler.finish("stopped")
         error_manager.log_error(e)
     except Exception as e:
+        run_profiler.finish("failed")
         error_manager.log_exception(e)
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+import sys
+from pathlib import Path
+
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+import hashlib
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+from common.config_handler import config
+from common.error_handler import error_manager
+
+
+class SheetManifest:
+    """
+    Load manifest for incremental ETL runs.
+
+    `etl_sheet_manifest` keeps one row per optovik sheet with a content fingerprint
+    and row count of the last successful load. Sheets whose fingerprint did not
+    change are skipped before mapping, territory resolution and hashing.
+    """
+    TABLE = "etl_sheet_manifest"
+
+    def __init__(self):
+        self.engine = None
+        self.loaded = {}
+        self.pending = {}
+        try:
+            self.engine = create_engine(config.database_conn_string, echo=False)
+            self._ensure_table()
+            loaded_df = pd.read_sql_query(f"SELECT Optovik, Fingerprint, SheetRowCount FROM {self.TABLE}", self.engine)
+            self.loaded = {
+                r.Optovik: (r.Fingerprint, r.SheetRowCount)
+                for r in loaded_df.itertuples()
+            }
+        except SQLAlchemyError as e:
+            # without a manifest every sheet counts as changed (full run)
+            error_manager.log_warning(f"ETL manifest unavailable, all sheets will be processed: {e}")
+            self.engine = None
+
+    def _ensure_table(self):
+        with self.engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = :table_name"),
+                {"table_name": self.TABLE}
+            ).fetchone()
+            if not exists:
+                conn.execute(text(f"""
+                    CREATE TABLE {self.TABLE} (
+                        Optovik NVARCHAR(255) NOT NULL PRIMARY KEY,
+                        Fingerprint CHAR(64) NOT NULL,
+                        SheetRowCount INT NOT NULL,
+                        last_updated DATETIME NOT NULL
+                    )
+                """))
+
+    @staticmethod
+    def _frame_digest(df):
+        digest = hashlib.sha256()
+        digest.update("|".join(map(str, df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _reference_digest():
+        """Files shared by every sheet: a change here invalidates all sheets"""
+        digest = hashlib.sha256()
+        for path in [config.source_path_drug_groups, config.path_for_region_js,
+                     config.path_for_teritory_js, config.regions_to_be_corrected]:
+            path = Path(path)
+            if path.exists():
+                digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    def changed_sheets(self, optoviks, dictionaries):
+        """Return the sheets to process; remembers their fingerprints for `commit`"""
+        reference = self._reference_digest()
+        changed = []
+        for sheet, optovik_df in optoviks.items():
+            digest = hashlib.sha256()
+            digest.update(reference.encode())
+            digest.update(self._frame_digest(optovik_df).encode())
+            if sheet in dictionaries:
+                digest.update(self._frame_digest(dictionaries[sheet]).encode())
+            fingerprint = (digest.hexdigest(), len(optovik_df))
+
+            if self.loaded.get(sheet) == fingerprint:
+                error_manager.log_info(f"  {sheet}: unchanged since last load ({fingerprint[1]} rows), skipped.")
+                continue
+            self.pending[sheet] = fingerprint
+            changed.append(sheet)
+
+        error_manager.log_info(f"  {len(changed)} of {len(optoviks)} optovik sheets changed since last load")
+        return changed
+
+    def commit(self):
+        """Record fingerprints of the sheets loaded in this run"""
+        if self.engine is None or not self.pending:
+            return
+        now = datetime.now()
+        params = [
+            {"optovik": sheet, "fingerprint": fingerprint, "row_count": row_count, "now": now}
+            for sheet, (fingerprint, row_count) in self.pending.items()
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(text(f"""
+                MERGE {self.TABLE} AS t
+                USING (SELECT :optovik AS Optovik) AS s
+                ON t.Optovik = s.Optovik
+                WHEN MATCHED THEN
+                    UPDATE SET Fingerprint = :fingerprint, SheetRowCount = :row_count, last_updated = :now
+                WHEN NOT MATCHED THEN
+                    INSERT (Optovik, Fingerprint, SheetRowCount, last_updated)
+                    VALUES (:optovik, :fingerprint, :row_count, :now);
+            """), params)
+        error_manager.log_info(f"  ETL manifest updated for {len(params)} sheets")
+        self.loaded.update(self.pending)
+        self.pending = {}
+
+    def dispose(self):
+        if self.engine:
+            self.engine.dispose()
@@ -9,12 +9,15 @@ project_root = current_dir.parent
 sys.path.append(str(project_root))
 
 from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
 import pandas as pd
 from datetime import datetime
 import hashlib
 from common.config_handler import config
 from common.error_handler import error_manager, ExpectedCustomError
+from common.run_profiler import run_profiler
+from dashboard_automation.bulk_loader import get_bulk_loader
 
 class SalesDataWarehouse:
     def __init__(self):
@@ -32,12 +35,23 @@ class SalesDataWarehouse:
                 'product': {},
                 'time': {}
             }
+
+            # Staging-table loader (config: fact_bulk_loader) and its throughput per load
+            self.bulk_loader = get_bulk_loader()
+            self.load_stats = []
+        except ExpectedCustomError:
+            raise
         except Exception as e:
             raise RuntimeError(f"\n❌ Failed to initialize SalesDataWarehouse: {e}")
 
     def database_connection(self) -> bool:
         try:
-            self.engine = create_engine(self.connection_string, echo=False)
+            url = make_url(self.connection_string)
+            # pyodbc sends executemany parameter sets as one array instead of row by row
+            engine_kwargs = {}
+            if url.get_backend_name() == "mssql" and url.get_driver_name() == "pyodbc":
+                engine_kwargs["fast_executemany"] = True
+            self.engine = create_engine(self.connection_string, echo=False, **engine_kwargs)
             self.ensure_schema()
         except Exception as e:
             raise ExpectedCustomError(
@@ -127,6 +141,7 @@ class SalesDataWarehouse:
         except SQLAlchemyError as e:
             raise SQLAlchemyError(f"\n❌ Schema creation failed: {e}")
 
+    @run_profiler.staged("transform")
     def transform_data(self, optovik_dict, drug_groups_df_melted, stage=False):
         """Transform raw data into structured format"""
             # Combine all sheets
@@ -171,136 +186,74 @@ class SalesDataWarehouse:
         except Exception as e:
             raise RuntimeError(f"\n❌ Data transformation failed: {e}")
 
+    @run_profiler.staged("upsert_dimension")
     def upsert_dimension(self, df, table_name, business_key, attributes):
-        """Generic dimension upsert with Type 1 SCD handling"""
+        """Generic dimension upsert with Type 1 SCD handling (set-based: staging table + MERGE)"""
         try:
                 
             if df.empty:
                 return {}
-            
-            # Fix SettingWithCopyWarning
-            df = df.copy()
 
-            # Get existing records
-            unique_keys = df[business_key].unique().tolist()
-            if not unique_keys:
+            columns = [business_key] + attributes
+            candidates = df[columns].drop_duplicates(subset=[business_key])
+            if candidates.empty:
                 return {}
 
-            # Build column list for query
-            columns = [business_key, 'last_updated']
-            if attributes:
-                columns = [business_key] + attributes + ['last_updated']
-            
-            # Chunk processing for large datasets
-            CHUNK_SIZE = 1000
-            existing_chunks = []
-            for i in range(0, len(unique_keys), CHUNK_SIZE):
-                chunk = unique_keys[i:i+CHUNK_SIZE]
-                placeholders = ','.join([':val' + str(i) for i in range(len(chunk))])
-                query = text(f"""
-                    SELECT {', '.join(columns)}
-                    FROM {table_name}
-                    WHERE {business_key} IN ({placeholders})
-                """)
-                params = {f'val{j}': key for j, key in enumerate(chunk)}
-                chunk_df = pd.read_sql_query(query, self.engine, params=params)
-                existing_chunks.append(chunk_df)
-            
-            existing = pd.concat(existing_chunks, ignore_index=True)
-            
-            # Prepare updates and inserts
+            staging_name = f"#staging_{table_name}"
+            # Handle special case for dim_optovik
+            id_col = "Optovik_ID" if table_name == "dim_optovik" else f"{table_name.split('_')[1]}_ID"
             now = datetime.now()
-            df['last_updated'] = now
-            
-            # New records - ensure no duplicates
-            new_mask = ~df[business_key].isin(existing[business_key])
-            new_records = df[new_mask].drop_duplicates(subset=[business_key])
-            
-            # Changed records (Type 1 SCD) - Only if attributes exist
-            changed_records = pd.DataFrame()
-            if attributes and not existing.empty:
-                merged = df.merge(
-                    existing, 
-                    on=business_key, 
-                    suffixes=('', '_old'),
-                    how='inner'
-                )
-                
-                changed_mask = False
-                for attr in attributes:
-                    # Handle potential NaN values
-                    merged[attr] = merged[attr].fillna('')
-                    merged[f"{attr}_old"] = merged[f"{attr}_old"].fillna('')
-                    changed_mask |= (merged[attr] != merged[f"{attr}_old"])
-                changed_records = merged[changed_mask]
-            
-            # Execute updates
-            if not changed_records.empty and attributes:
-                set_clause = ', '.join([f"{attr} = :{attr}" for attr in attributes])
-                update_stmt = text(f"""
-                    UPDATE {table_name}
-                    SET {set_clause}, last_updated = :now
-                    WHERE {business_key} = :key_value
-                """)
-                params = []
-                for _, row in changed_records.iterrows():
-                    param_dict = {attr: row[attr] for attr in attributes}
-                    param_dict['now'] = now
-                    param_dict['key_value'] = row[business_key]
-                    params.append(param_dict)
-                
-                try:
-                    with self.engine.begin() as conn:
-                        conn.execute(update_stmt, params)
-                    error_manager.log_info(f"  Updated {len(changed_records)} records in {table_name}")
-                except SQLAlchemyError as e:
-                    error_manager.log_info(f"Failed to update {table_name}: {str(e)}")
-            
-            # Execute inserts - one by one to catch duplicates
-            inserted_count = 0
-            if not new_records.empty:
-                insert_cols = [business_key] + attributes + ['last_updated'] if attributes else [business_key, 'last_updated']
-                insert_stmt = text(f"""
-                    INSERT INTO {table_name} ({', '.join(insert_cols)})
-                    VALUES ({', '.join([':' + col for col in insert_cols])})
-                """)
-                
-                for _, row in new_records.iterrows():
-                    values = {col: row[col] for col in insert_cols}
-                    try:
-                        with self.engine.begin() as conn:
-                            conn.execute(insert_stmt, values)
-                        inserted_count += 1
-                    except IntegrityError:  # Duplicate key error
-                        error_manager.log_info(f"Warning: Skipping duplicate {business_key}: {values[business_key]}")
-                    except SQLAlchemyError as e:
-                        raise RuntimeError(f"  Failed to insert into {table_name}: {str(e)}")
-                
-                error_manager.log_info(f"  Inserted {inserted_count} records into {table_name}")
-            
-            # Retrieve dimension IDs
-            id_chunks = []
-            for i in range(0, len(unique_keys), CHUNK_SIZE):
-                chunk = unique_keys[i:i+CHUNK_SIZE]
-                placeholders = ','.join([':val' + str(i) for i in range(len(chunk))])
-                # Handle special case for dim_optovik
-                id_col = "Optovik_ID" if table_name == "dim_optovik" else f"{table_name.split('_')[1]}_ID"
-                id_query = text(f"""
-                    SELECT {business_key}, {id_col} 
-                    FROM {table_name} 
-                    WHERE {business_key} IN ({placeholders})
-                """)
-                params = {f'val{j}': key for j, key in enumerate(chunk)}
-                chunk_df = pd.read_sql_query(id_query, self.engine, params=params)
-                id_chunks.append(chunk_df)
-            
-            id_map = pd.concat(id_chunks, ignore_index=True)
+
+            # Type 1 SCD: attributes compared the same way as before (NULL == '')
+            merge_parts = [
+                f"MERGE {table_name} WITH (HOLDLOCK) AS t",
+                f"USING {staging_name} AS s",
+                f"ON t.{business_key} = s.{business_key}",
+            ]
+            if attributes:
+                changed = ' OR '.join(f"ISNULL(t.{attr}, '') <> ISNULL(s.{attr}, '')" for attr in attributes)
+                set_clause = ', '.join(f"t.{attr} = s.{attr}" for attr in attributes)
+                merge_parts.append(f"WHEN MATCHED AND ({changed}) THEN UPDATE SET {set_clause}, t.last_updated = :now")
+            insert_cols = columns + ['last_updated']
+            merge_parts.append(
+                f"WHEN NOT MATCHED BY TARGET THEN INSERT ({', '.join(insert_cols)}) "
+                f"VALUES ({', '.join('s.' + col for col in columns)}, :now)"
+            )
+            merge_parts.append("OUTPUT $action;")
+            merge_stmt = text("\n".join(merge_parts))
+
+            with self.engine.begin() as conn:
+                # Staging table copies column types and collations of the dimension
+                conn.execute(text(f"DROP TABLE IF EXISTS {staging_name}"))
+                conn.execute(text(f"SELECT TOP 0 {', '.join(columns)} INTO {staging_name} FROM {table_name}"))
+
+                self.bulk_loader.load(conn, staging_name, candidates, columns=columns)
+                self.load_stats.append(self.bulk_loader.last_stats)
+
+                actions = [row[0] for row in conn.execute(merge_stmt, {"now": now})]
+                updated_count = actions.count('UPDATE')
+                inserted_count = actions.count('INSERT')
+
+                # Retrieve dimension IDs for every staged business key
+                id_map = pd.read_sql_query(text(f"""
+                    SELECT s.{business_key}, t.{id_col}
+                    FROM {staging_name} s
+                    JOIN {table_name} t ON t.{business_key} = s.{business_key}
+                """), conn)
+
+                conn.execute(text(f"DROP TABLE IF EXISTS {staging_name}"))
+
+            if updated_count:
+                error_manager.log_info(f"  Updated {updated_count} records in {table_name}")
+            error_manager.log_info(f"  Inserted {inserted_count} records into {table_name}")
+
             id_dict = id_map.set_index(business_key).iloc[:, 0].to_dict()
             
             return id_dict
         except Exception as e:
             raise RuntimeError(f"\n❌ Upsert dimension '{table_name}' failed: {e}")
 
+    @run_profiler.staged("upsert_time_dimension")
     def upsert_time_dimension(self, df):
         """Special handling for time dimension (append only)"""
         try:
@@ -355,6 +308,7 @@ class SalesDataWarehouse:
         except Exception as e:
             raise RuntimeError(f"\n❌ Upsert time dimension failed: {e}")
 
+    @run_profiler.staged("fact_load")
     def load_fact_data(self, fact_df):
         """Efficient fact table loading with hash-based deduplication"""
         try:
@@ -365,6 +319,7 @@ class SalesDataWarehouse:
             # Create staging table
             staging_name = "#staging_fact_sales"
             try:
+                # one connection: the #staging table only lives in this session
                 with self.engine.begin() as conn:
                     conn.execute(text(f"""
                         CREATE TABLE {staging_name} (
@@ -378,18 +333,14 @@ class SalesDataWarehouse:
                         )
                     """))
                 
-                # Bulk insert to staging
-                insert_stmt = text(f"""
-                    INSERT INTO {staging_name} 
-                    VALUES (:RowHash, :Optovik_ID, :Customer_ID, 
-                            :Product_ID, :Time_ID, :Quantity, :TotalSales)
-                """)
-                data_dicts = fact_df.to_dict(orient='records')
-                with self.engine.begin() as conn:
-                    conn.execute(insert_stmt, data_dicts)
+                    # Bulk insert to staging
+                    self.bulk_loader.load(conn, staging_name, fact_df, columns=[
+                        'RowHash', 'Optovik_ID', 'Customer_ID',
+                        'Product_ID', 'Time_ID', 'Quantity', 'TotalSales'
+                    ])
+                    self.load_stats.append(self.bulk_loader.last_stats)
                 
-                # Load new facts
-                with self.engine.begin() as conn:
+                    # Load new facts
                     result = conn.execute(text(f"""
                         INSERT INTO fact_sales (
                             RowHash, Optovik_ID, Customer_ID, 
@@ -404,10 +355,8 @@ class SalesDataWarehouse:
                     """))
                     new_count = result.rowcount
                     error_manager.log_info(f"    Loaded {new_count} new fact records.")
+                    conn.execute(text(f"DROP TABLE IF EXISTS {staging_name}"))
                 
-            except SQLAlchemyError as e:
-                error_manager.log_info(f"Warning: Fact load failed: {str(e)}")
-                new_count = 0
             finally:
                 # Cleanup staging
                 try:
@@ -417,12 +366,76 @@ class SalesDataWarehouse:
                     pass
             return new_count
         
-        except SQLAlchemyError as e:
-            error_manager.log_error(f"Fact load failed: {e}")
-            return 0
         except Exception as e:
+            # a failed load must fail the run: the ETL manifest would record the sheets as loaded
             raise RuntimeError(f"\n❌ Fact data load failed: {e}")
 
+    @run_profiler.staged("prepare_facts")
+    def prepare_fact_data(self, main_df, hash_batch_size=50000):
+        """Columnar fact preparation: map dimension IDs and hash rows over whole columns"""
+        try:
+            error_manager.log_info("  Preparing fact data...")
+
+            # Map dimension IDs column-wise (NaN where the key is unknown)
+            optovik_ids = main_df['Optovik'].map(self.id_maps['optovik'])
+            customer_ids = main_df['Customer'].map(self.id_maps['customer'])
+            product_ids = main_df['Product'].map(self.id_maps['product'])
+
+            # Time keys are (Year, Month, Day) tuples -> positional lookup on a MultiIndex
+            time_ids = pd.Series(float('nan'), index=main_df.index)
+            date_mask = main_df[['Year', 'Month', 'Day']].notna().all(axis=1)
+            if self.id_maps['time'] and date_mask.any():
+                time_index = pd.MultiIndex.from_tuples(
+                    [tuple(int(part) for part in key) for key in self.id_maps['time'].keys()]
+                )
+                time_values = pd.Series(list(self.id_maps['time'].values()))
+                dates = main_df.loc[date_mask, ['Year', 'Month', 'Day']].astype('int64')
+                positions = time_index.get_indexer(pd.MultiIndex.from_frame(dates))
+                found = positions >= 0
+                time_ids.loc[dates.index[found]] = time_values.iloc[positions[found]].to_numpy()
+
+            # Skip invalid references
+            valid_mask = optovik_ids.notna() & customer_ids.notna() & product_ids.notna() & time_ids.notna()
+            valid_rows = int(valid_mask.sum())
+            skipped_rows = len(main_df) - valid_rows
+            error_manager.log_info(f"    Valid rows: {valid_rows}, Skipped rows: {skipped_rows}")
+
+            fact_df = pd.DataFrame({
+                'Optovik_ID': optovik_ids[valid_mask].astype('int64'),
+                'Customer_ID': customer_ids[valid_mask].astype('int64'),
+                'Product_ID': product_ids[valid_mask].astype('int64'),
+                'Time_ID': time_ids[valid_mask].astype('int64'),
+                'Quantity': main_df.loc[valid_mask, 'Quantity'],
+                'TotalSales': main_df.loc[valid_mask, 'TotalSales'],
+            }).reset_index(drop=True)
+
+            fact_df.insert(0, 'RowHash', self._row_hashes(fact_df, hash_batch_size))
+            return fact_df
+        except Exception as e:
+            raise RuntimeError(f"\n❌ Fact data preparation failed: {e}")
+
+    @staticmethod
+    def _row_hashes(fact_df, batch_size):
+        """
+        Hash fact rows in column batches.
+
+        The hashed string must stay byte-identical to the one used for rows that are
+        already in fact_sales ("{ids}|{Quantity}|{TotalSales}" with Python str() formatting),
+        otherwise the RowHash anti-join would reload existing facts.
+        """
+        columns = ['Optovik_ID', 'Customer_ID', 'Product_ID', 'Time_ID', 'Quantity', 'TotalSales']
+        hashes = []
+        sha256 = hashlib.sha256
+        for start in range(0, len(fact_df), batch_size):
+            batch = fact_df.iloc[start:start + batch_size]
+            # tolist() gives Python int/float, so str() matches the per-row f-string exactly
+            parts = [batch[col].tolist() for col in columns]
+            hashes.extend(
+                sha256(f"{o}|{c}|{p}|{t}|{q}|{s}".encode()).hexdigest()
+                for o, c, p, t, q, s in zip(*parts)
+            )
+        return hashes
+
     def run_etl(self, optovik_dict, drug_groups_df_melted):
         """Main ETL orchestration method"""
         try:
@@ -462,48 +475,18 @@ class SalesDataWarehouse:
             self.id_maps['time'] = self.upsert_time_dimension(main_df)
             
             # Step 4: Prepare fact table
-            error_manager.log_info("  Preparing fact data...")
-            fact_data = []
-            skipped_rows = 0
-            valid_rows = 0
-            
-            for _, row in main_df.iterrows():
-                # Get dimension IDs with fallback to None
-                optovik_id = self.id_maps['optovik'].get(row['Optovik'])
-                customer_id = self.id_maps['customer'].get(row['Customer'])
-                product_id = self.id_maps['product'].get(row['Product'])
-                time_id = self.id_maps['time'].get((row['Year'], row['Month'], row['Day']))
-                
-                # Skip invalid references
-                if None in (optovik_id, customer_id, product_id, time_id):
-                    skipped_rows += 1
-                    continue
-                
-                valid_rows += 1
-                # Generate row hash
-                hash_str = (
-                    f"{optovik_id}|{customer_id}|{product_id}|{time_id}|"
-                    f"{row['Quantity']}|{row['TotalSales']}"
-                )
-                row_hash = hashlib.sha256(hash_str.encode()).hexdigest()
-                
-                fact_data.append((
-                    row_hash, optovik_id, customer_id, 
-                    product_id, time_id, row['Quantity'], row['TotalSales']
-                ))
-            
-            error_manager.log_info(f"    Valid rows: {valid_rows}, Skipped rows: {skipped_rows}")
-            
-            fact_df = pd.DataFrame(fact_data, columns=[
-                'RowHash', 'Optovik_ID', 'Customer_ID', 
-                'Product_ID', 'Time_ID', 'Quantity', 'TotalSales'
-            ])
-            
+            fact_df = self.prepare_fact_data(main_df)
+
             # Step 5: Load fact data
             error_manager.log_info("  Loading fact data...")
             new_rows = self.load_fact_data(fact_df)
             
             # Step 6: Finalize
+            for stats in self.load_stats:
+                error_manager.log_info(
+                    f"    Bulk load [{stats['backend']}] {stats['table']}: "
+                    f"{stats['rows']} rows, {stats['rows_per_second']:,.0f} rows/s"
+                )
             error_manager.log_info(f"  ETL completed successfully. Loaded {new_rows} new records.")
             return new_rows
             
@@ -0,0 +1,232 @@
+import sys
+from pathlib import Path
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+from functools import lru_cache
+from common.config_handler import config
+
+
+@lru_cache(maxsize=None)
+def column_letter(col):
+    """Excel column letter of a 1-based column index (1 -> A, 27 -> AA)"""
+    letters = ""
+    while col > 0:
+        col, remainder = divmod(col - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def header_rows(df):
+    """Rows 1-2 as pandas writes a 2-level column header: level 0 merged over equal neighbours"""
+    level_0 = list(df.columns.get_level_values(0))
+    level_1 = list(df.columns.get_level_values(1))
+    row_1 = [''] + [None] * len(level_0)
+    merges = []
+    i = 0
+    while i < len(level_0):
+        j = i
+        while j + 1 < len(level_0) and level_0[j + 1] == level_0[i]:
+            j += 1
+        row_1[i + 1] = level_0[i]
+        if j > i:
+            merges.append(f"{column_letter(i + 2)}1:{column_letter(j + 2)}1")
+        i = j + 1
+    return row_1, [''] + level_1, merges
+
+
+def _sum_template(cols):
+    """'=E{row}+G{row}' for the given columns, filled per row with str.format"""
+    return "=" + "+".join(f"{column_letter(col)}{{row}}" for col in cols)
+
+
+class FormulaPlan:
+    """
+    Outline groups and formulas of one report sheet, worked out once from plain values.
+
+    Layout is the one `to_excel` gives a MapSplitRegion frame: two header rows, the
+    index-name row 3, data from row 4 and the four final rows after it. Nothing here
+    touches openpyxl; writers only read `cells` ({row: {col: value}}), the outline
+    lists and `total_sheet_entries`.
+    """
+    def __init__(self, sheet, header_row, index_values, client_values, last_rows,
+                 list_for_outlining_columns, drug_reference, total_sheet=False):
+        self.sheet = sheet
+        self.header_row = header_row
+        self.max_column = len(header_row)
+        self.max_row = len(index_values) + 3
+        self.final_sum, self.final_sum_10, self.final_sum_rekl, self.final_sum_leks = (
+            self.max_row + 1, self.max_row + 2, self.max_row + 3, self.max_row + 4
+        )
+
+        self.grouped_rows, self.hidden_rows, self.sum_ranges = self._customer_groups(index_values, client_values, last_rows)
+        self.grouped_col_indexes, self.hidden_cols = self._drug_groups(list_for_outlining_columns)
+        self.start_end_of_groups = self._group_ranges()
+
+        self.cells = {}
+        self.total_sheet_entries = []
+        self._plan_formulas(drug_reference, total_sheet)
+
+    @classmethod
+    def from_frame(cls, df, sheet, outline_key, last_row_indexes, list_for_outlining_columns, drug_reference, total_sheet=False):
+        """Plan for a DataFrame before it is written (index goes to column A, clients to B)"""
+        row_1, _, _ = header_rows(df)
+        # empty cells read back as None from a written sheet
+        client_values = df.iloc[:, 0].astype(object).where(df.iloc[:, 0].notna(), None).tolist()
+        return cls(sheet, row_1, df.index.tolist(), client_values, last_row_indexes.get(outline_key, {}),
+                   list_for_outlining_columns, drug_reference, total_sheet)
+
+    @classmethod
+    def from_worksheet(cls, ws, sheet, outline_key, last_row_indexes, list_for_outlining_columns, drug_reference, total_sheet=False):
+        """Plan for a sheet already written by `to_excel` (read in one pass over columns A-B)"""
+        header_row = [cell.value for cell in ws[1]]
+        index_values, client_values = [], []
+        for col_a, col_b in ws.iter_rows(min_row=4, max_row=ws.max_row, min_col=1, max_col=2, values_only=True):
+            index_values.append(col_a)
+            client_values.append(col_b)
+        return cls(sheet, header_row, index_values, client_values, last_row_indexes.get(outline_key, {}),
+                   list_for_outlining_columns, drug_reference, total_sheet)
+
+    # OUTLINES
+    def _customer_groups(self, index_values, client_values, last_rows):
+        """Optovik header rows, the hidden client rows under them and their SUM ranges"""
+        grouped_rows, hidden_rows, sum_ranges = [], [], {}
+        start = False
+        for offset, (col_a, col_b) in enumerate(zip(index_values, client_values)):
+            row = offset + 4
+            if col_a == 0 and col_b in last_rows:
+                start = True
+                group_header_row = row
+                grouped_rows.append(row)
+                group_start_row = row + 1
+                last_row_value = last_rows[col_b]
+                continue
+            if start:
+                hidden_rows.append(row)
+            if start and col_a == last_row_value:
+                sum_ranges[group_header_row] = (group_start_row, row)
+                start = False
+        return grouped_rows, hidden_rows, sum_ranges
+
+    def _drug_groups(self, list_for_outlining_columns):
+        """Drug-group total columns {group: (qty_col, sales_col)} and the drug columns hidden under them"""
+        grouped_col_indexes = {}
+        group_col_numbers = []
+        for col, cell_value in enumerate(self.header_row, start=1):
+            if cell_value in list_for_outlining_columns:
+                group_col_numbers.append(col)
+                grouped_col_indexes[cell_value] = (col, col + 1)
+
+        hidden_cols = []
+        for ind in range(len(group_col_numbers)):
+            start = group_col_numbers[ind] + 2
+            stop = self.max_column - 1 if ind == len(group_col_numbers) - 1 else group_col_numbers[ind + 1]
+            hidden_cols.extend(range(start, stop))
+        return grouped_col_indexes, hidden_cols
+
+    def _group_ranges(self):
+        """First and last drug column of every group (the last group runs up to the Itogo columns)"""
+        start_end_of_groups = {}
+        keys = list(self.grouped_col_indexes.keys())
+        for i in range(len(keys) - 1):
+            start_end_of_groups[keys[i]] = (self.grouped_col_indexes[keys[i]][1] + 1, self.grouped_col_indexes[keys[i + 1]][0] - 1)
+        if keys:
+            start_end_of_groups[keys[-1]] = (self.grouped_col_indexes[keys[-1]][1] + 1, self.max_column - 2)
+        return start_end_of_groups
+
+    # FORMULAS
+    def _put(self, row, col, value):
+        self.cells.setdefault(row, {})[col] = value
+
+    def _plan_formulas(self, drug_reference, total_sheet):
+        """Cells in the order the old openpyxl passes wrote them, so later writes still win"""
+        max_column, final_sum = self.max_column, self.final_sum
+        final_sum_10, final_sum_rekl, final_sum_leks = self.final_sum_10, self.final_sum_rekl, self.final_sum_leks
+        grouped = set(self.grouped_rows)
+
+        # SUM over the hidden clients of every optovik
+        for header_row, (start_row, end_row) in self.sum_ranges.items():
+            for col in range(5, max_column + 1):
+                letter = column_letter(col)
+                self._put(header_row, col, f"=SUM({letter}{start_row}:{letter}{end_row})")
+
+        self._put(final_sum, 2, config.final_sum)
+        self._put(final_sum_10, 2, config.final_sum_minus10)
+        self._put(final_sum_rekl, 2, config.final_sum_reklama)
+        self._put(final_sum_leks, 2, config.final_sum_leksiya_text)
+
+        # one template per group and target column instead of one join per row
+        group_cols = []
+        for group, (start_col, end_col) in self.start_end_of_groups.items():
+            cols = list(range(start_col, end_col + 1))
+            qty_target_col, sales_target_col = self.grouped_col_indexes[group]
+            group_cols.append((cols[0::2], cols[1::2], qty_target_col, sales_target_col,
+                               _sum_template(cols[0::2]), _sum_template(cols[1::2])))
+
+        def grouped_columns(write_qty, write_sales, start_row, end_row):
+            for _, _, qty_target_col, sales_target_col, qty_template, sales_template in group_cols:
+                for row in range(start_row, end_row + 1):
+                    if row not in grouped:
+                        if write_sales:
+                            self._put(row, sales_target_col, sales_template.format(row=row))
+                        if write_qty:
+                            self._put(row, qty_target_col, qty_template.format(row=row))
+
+        grouped_columns(True, True, 4, final_sum - 1)
+
+        # VERTICAL ITOGO COLUMNS
+        sales_cols_itogo = [t[1] for t in self.grouped_col_indexes.values()]
+        qty_itogo_template = _sum_template([t[0] for t in self.grouped_col_indexes.values()])
+        sales_itogo_template = _sum_template(sales_cols_itogo)
+        for row in range(4, final_sum_leks + 1):
+            if row not in grouped and row != final_sum:
+                self._put(row, max_column - 1, qty_itogo_template.format(row=row))
+                self._put(row, max_column, sales_itogo_template.format(row=row))
+
+        # FINAL SUM ROW
+        for col in range(5, max_column + 1):
+            letter = column_letter(col)
+            self._put(final_sum, col, "=" + "+".join(f"{letter}{row}" for row in self.grouped_rows))
+
+        # TOTAL SHEET data (links to this sheet's final rows)
+        if total_sheet and self.sheet != config.vtorichka_sheet_name:
+            self.total_sheet_entries.append(self.sheet)
+            sales_cols_gr = set(sales_cols_itogo)
+            for col in range(5, max_column + 1):
+                if col in sales_cols_gr:
+                    self.total_sheet_entries.append(f"='{self.sheet}'!{column_letter(col)}{final_sum}")
+            self.total_sheet_entries.append(None)
+            for row in [final_sum_10, final_sum_rekl, final_sum_leks]:
+                self.total_sheet_entries.append(f"='{self.sheet}'!{column_letter(max_column)}{row}")
+
+        grouped_columns(False, True, final_sum_10, final_sum_leks)
+
+        for quantity_cols, sales_cols, _, _, _, _ in group_cols:
+            # FINAL SUM (Minus 10) and Final sum for Leksiya
+            for col in sales_cols:
+                letter = column_letter(col)
+                self._put(final_sum_10, col, f"={letter}{final_sum}*{config.final_sum_minus}%")
+                self._put(final_sum_leks, col, f"={letter}{final_sum_10}*{config.final_sum_leksiya}%")
+
+            # FINAL SUM reklama
+            for qty_col in quantity_cols:
+                sales_col = qty_col + 1
+                drug = self.header_row[qty_col - 1]
+                if drug not in drug_reference:
+                    self._put(final_sum_rekl, sales_col, "Drug name didn't match")
+                    continue
+                vtorich_val, regions_val = drug_reference[drug]
+                multiplier = vtorich_val if self.sheet == config.vtorichka_sheet_name else regions_val
+                if self.is_percentage(multiplier):
+                    formula = f"={column_letter(sales_col)}{final_sum_10}*{multiplier}"
+                else:
+                    formula = f"={column_letter(qty_col)}{final_sum}*{multiplier}"
+                self._put(final_sum_rekl, sales_col, formula)
+
+    @staticmethod
+    def is_percentage(value):
+        return isinstance(value, float) and 0 < value <= 1
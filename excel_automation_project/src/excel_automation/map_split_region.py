@@ -26,16 +26,17 @@ class MapSplitRegion():
 
         self.last_row_indexes = defaultdict(dict)
 
-        self.gr_name_empty_dfs = {}
+        self._column_layouts = {}
 
         self.list_for_outlining_columns = []
 
     def load_and_prepare_data(self):
         for sheet,optovik_df in self.dm.pivoted_optoviks.items():
+            group_size = len(optovik_df)
             optovik_df = self._emtpy_row_adding_top(optovik_df,sheet)
             if sheet in config.reserve_column_values_list:
-                self._finding_last_row_index(optovik_df,sheet,sheet)
-            self._finding_last_row_index(optovik_df,config.vtorichka_sheet_name,sheet)
+                self._finding_last_row_index(group_size,sheet,sheet)
+            self._finding_last_row_index(group_size,config.vtorichka_sheet_name,sheet)
 
             self.optiviks_container[sheet] = optovik_df
 
@@ -49,8 +50,9 @@ class MapSplitRegion():
         df.loc[0, (config.main_header_name, config.client_header_name)] = sheet
         return df
 
-    def _finding_last_row_index(self,df,sheet_name,optovik, teritory=False):
-        last_index = df.index[-1]
+    def _finding_last_row_index(self,group_size,sheet_name,optovik, teritory=False):
+        # the optovik name row gets index 0, its clients 1..group_size
+        last_index = group_size
         if teritory:
             # self.dm.add_last_row_indexes(f"{sheet_name}_|_",optovik,last_index)
             self.last_row_indexes[f"{sheet_name}_|_"][optovik] = last_index
@@ -59,35 +61,51 @@ class MapSplitRegion():
             self.last_row_indexes[sheet_name][optovik] = last_index
 
     def split_dfs_by_region(self):
+        region_col = (config.main_header_name, config.region_header_name)
+        territory_col = (config.main_header_name, config.territory_header_name)
         for optovik, optivik_df in self.optiviks_container.items():
             if optovik in config.reserve_column_values_list:
                 continue
-            
-            # FIND ALL REGIONS
-            regions = optivik_df[(config.main_header_name, config.region_header_name)].dropna().unique()
-            for region in regions:
-                # SEPARATE EACH REGION
-                mask = optivik_df[(config.main_header_name, config.region_header_name)] == region
-                region_df = optivik_df[mask]
 
-                region_df_final = self._emtpy_row_adding_top(region_df,optovik)
-                self._finding_last_row_index(region_df_final,region,optovik)
+            # one pass per key instead of a mask per region and per territory;
+            # sort=False keeps first-appearance order, NaN keys are dropped like dropna().unique()
+            teritories_by_region = defaultdict(list)
+            for (region, teritory), teritory_df in optivik_df.groupby([region_col, territory_col], sort=False):
+                teritories_by_region[region].append((teritory, teritory_df))
+
+            for region, region_df in optivik_df.groupby(region_col, sort=False):
+                # SEPARATE EACH REGION (the optovik name row is added once, in concat_dataframes)
+                self._finding_last_row_index(len(region_df),region,optovik)
 
                 # STORE IT
-                self.regionvise_dfs[region].append(region_df_final)
+                self.regionvise_dfs[region].append((optovik, region_df))
 
                 # SPLIT by TERRITORY
-                
-                teritories = region_df[(config.main_header_name, config.territory_header_name)].dropna().unique()
-                for teritory in teritories:
-                    t_mask = region_df[(config.main_header_name, config.territory_header_name)] == teritory
-                    teritory_df = region_df[t_mask]
-
-                    teritory_df = self._emtpy_row_adding_top(teritory_df, optovik)
-                    self._finding_last_row_index(teritory_df,teritory,optovik, teritory=True)
+                for teritory, teritory_df in teritories_by_region[region]:
+                    self._finding_last_row_index(len(teritory_df),teritory,optovik, teritory=True)
 
                     # store
-                    self.teritoryvise_dfs[region][teritory].append(teritory_df)
+                    self.teritoryvise_dfs[region][teritory].append((optovik, teritory_df))
+
+    def _stack_optovik_blocks(self, blocks):
+        """
+        [(optovik, df), ...] -> one frame built by a single concat. Every block starts with a
+        row holding the optovik name and is indexed 0..len(df), as _emtpy_row_adding_top does.
+        """
+        pieces, index, header_positions = [], [], []
+        position = 0
+        for _, df in blocks:
+            pieces.append(pd.DataFrame([[np.nan] * len(df.columns)], columns=df.columns))
+            pieces.append(df)
+            index.append(np.arange(len(df) + 1))
+            header_positions.append(position)
+            position += len(df) + 1
+
+        stacked = pd.concat(pieces, ignore_index=True)
+        client_col = stacked.columns.get_loc((config.main_header_name, config.client_header_name))
+        stacked.iloc[header_positions, client_col] = [optovik for optovik, _ in blocks]
+        stacked.index = np.concatenate(index)
+        return stacked
 
     def concat_dataframes(self):
         # CONCAT ALL main DATAFRAMES
@@ -101,70 +119,58 @@ class MapSplitRegion():
                 self.concated_by_regions_dfs[optovik] = reservs_df
 
         # CONCAT REGIONWISE DATAFRAMES
-        for region, optovik_list in self.regionvise_dfs.items():
-            self.concated_by_regions_dfs[region] = pd.concat(optovik_list)
+        # the split pieces are released as soon as their region is stacked
+        for region in list(self.regionvise_dfs):
+            self.concated_by_regions_dfs[region] = self._stack_optovik_blocks(self.regionvise_dfs.pop(region))
         
         # CONCAT teritory DATAFRAMES
-        for region_t, teritory_dict in self.teritoryvise_dfs.items():
-            for teritory, df_list  in teritory_dict.items():
-                self.concated_by_teritories_dfs[region_t][teritory] = pd.concat(df_list)
-
-    def add_empty_drug_group_columns(self,dataframe):
-        for gr_nm in self.dm.drug_groups_df.columns:
-            new_col = pd.DataFrame({
-                (gr_nm, config.quantity_header_name): [np.nan],
-                (gr_nm, config.total_sales_header_name): [np.nan]
-            })
-            self.gr_name_empty_dfs[gr_nm] = new_col
-
-        # Concatenate horizontally to form one row
-        groups = pd.concat(self.gr_name_empty_dfs.values(), axis=1)
-
-        dataframe = pd.concat([dataframe, groups], axis=1)
-        return dataframe
-
-    def reorder_columns_by_drug_grouping(self,dataframe):
-        # re order columns
-        new_order = list(dataframe.columns[:3]) #insert headers first
-        columns_to_check = dataframe.columns[3:] 
-        for gr_name, gr_df in self.gr_name_empty_dfs.items():
-            # add the group column
-            new_order.extend([
-                col for col in list(gr_df.columns)
-            ])
-            # add drug names that depends above grup
-            new_order.extend([
-                col for col in columns_to_check if col[0] in list(self.dm.drug_groups_df[gr_name])
-            ])
-            
-        self.list_for_outlining_columns = [i for i in self.gr_name_empty_dfs.keys()]
-        
-        # others check
-        if len(new_order) != len(dataframe.columns):
-            others_df = pd.DataFrame({
-                (config.ungroup_drugs_header_name, config.quantity_header_name): [np.nan],
-                (config.ungroup_drugs_header_name, config.total_sales_header_name): [np.nan]
-            })
-            dataframe = pd.concat([dataframe, others_df], axis=1)
+        for region_t in list(self.teritoryvise_dfs):
+            for teritory, blocks in self.teritoryvise_dfs.pop(region_t).items():
+                self.concated_by_teritories_dfs[region_t][teritory] = self._stack_optovik_blocks(blocks)
+
+    def _column_layout(self, columns):
+        """
+        Final column order for a frame with `columns`: the 3 header columns, then every drug
+        group's (Количество, Сумма) pair followed by its drugs, the ungrouped drugs and the
+        total pair. Frames with the same columns share one computed layout.
+        """
+        key = tuple(columns)
+        if key in self._column_layouts:
+            return self._column_layouts[key]
+
+        groups = list(self.dm.drug_groups_df.columns)
+        members = {gr_name: set(self.dm.drug_groups_df[gr_name]) for gr_name in groups}
+        def pair(name):
+            return [(name, config.quantity_header_name), (name, config.total_sales_header_name)]
+
+        all_columns = list(columns) + [col for gr_name in groups for col in pair(gr_name)]
+        new_order = all_columns[:3] #insert headers first
+        columns_to_check = all_columns[3:]
+        for gr_name in groups:
+            # the group column, then the drug names that depend on it
+            new_order.extend(pair(gr_name))
+            new_order.extend([col for col in columns_to_check if col[0] in members[gr_name]])
+        outlining_columns = list(groups)
 
-            new_order.extend([(config.ungroup_drugs_header_name, config.quantity_header_name), (config.ungroup_drugs_header_name, config.total_sales_header_name)])
-
-            for item in dataframe.columns:
-                if item not in new_order:
-                    new_order.append(item)
-            self.list_for_outlining_columns.append(config.ungroup_drugs_header_name)
-
-        # apply replacment
-        dataframe = dataframe[new_order]
+        # others check
+        if len(new_order) != len(all_columns):
+            new_order.extend(pair(config.ungroup_drugs_header_name))
+            placed = set(new_order)
+            new_order.extend([col for col in all_columns if col not in placed])
+            outlining_columns.append(config.ungroup_drugs_header_name)
 
         # total column
-        total_df = pd.DataFrame({
-            (config.total_header_name, config.quantity_header_name): [np.nan],
-            (config.total_header_name, config.total_sales_header_name): [np.nan]
-        })
+        new_order.extend(pair(config.total_header_name))
+
+        layout = (pd.MultiIndex.from_tuples(new_order, names=columns.names), outlining_columns)
+        self._column_layouts[key] = layout
+        return layout
 
-        dataframe = pd.concat([dataframe, total_df], axis=1)
-        return dataframe
+    def apply_column_layout(self, dataframe):
+        """Drug-group, ungrouped and total columns added (empty) and ordered in one reindex"""
+        layout, outlining_columns = self._column_layout(dataframe.columns)
+        self.list_for_outlining_columns = list(outlining_columns)
+        return dataframe.reindex(columns=layout)
 
 
 if __name__ == "__main__":
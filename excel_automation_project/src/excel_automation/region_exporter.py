@@ -0,0 +1,115 @@
+import sys
+from pathlib import Path
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+import os
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from common.config_handler import config
+from common.data_manager import DataManager
+from common.error_handler import error_manager
+from excel_automation.outlining_apply_formula import OutlineAndFormulas
+from excel_automation.report_renderer import StreamingReportRenderer
+
+
+def write_region_workbook(path, sheets, last_row_indexes, data_manager):
+    """
+    One regional workbook from [(sheet_name, prepared_df, outline_key, outlining_columns), ...].
+    Frames are already passed through MapSplitRegion.apply_column_layout, which also gives
+    their outlining columns. Returns the seconds spent on the file.
+    """
+    started = time.perf_counter()
+    if config.report_writer == "streaming":
+        renderer = StreamingReportRenderer(last_row_indexes, [], data_manager)
+        for sheet, df, outline_key, list_for_outlining_columns in sheets:
+            renderer.list_for_outlining_columns = list_for_outlining_columns
+            renderer.write_sheet(df, sheet, outline_key=outline_key)
+        renderer.save(path)
+    else:
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            for sheet, df, outline_key, list_for_outlining_columns in sheets:
+                df.to_excel(writer, sheet_name=sheet, index=True)
+                ws = writer.sheets[sheet]
+                step_two = OutlineAndFormulas(last_row_indexes, list_for_outlining_columns, data_manager)
+                # Apply modifications
+                ws = step_two.apply_outline_and_formulas(ws, sheet, outline_key)
+                step_two.apply_formatting(ws)
+    return time.perf_counter() - started
+
+
+def _region_sheets(step_one, region, teritory_dict):
+    """Region sheet first, then one sheet per territory when the region has two or more"""
+    frames = [(region, step_one.concated_by_regions_dfs[region], region)]
+    if len(teritory_dict.keys()) >= 2:
+        frames += [(teritory, df, f"{teritory}_|_") for teritory, df in teritory_dict.items()]
+
+    sheets = []
+    for sheet, df, outline_key in frames:
+        # the outlining columns differ per frame ('Others' only when it has ungrouped drugs)
+        prepared_df = step_one.apply_column_layout(df)
+        sheets.append((sheet, prepared_df, outline_key, step_one.list_for_outlining_columns))
+    return sheets
+
+
+def export_region_files(step_one, data_manager, workers=1):
+    """
+    Write config.path_for_po_gorodom / '{region}.xlsx' for every region.
+    workers > 1 builds the workbooks in a process pool (bounded by the CPU count); the
+    frames are prepared here and the workers only get the read-only outline configuration
+    and budget.
+    """
+    started = time.perf_counter()
+    config.path_for_po_gorodom.mkdir(parents=True, exist_ok=True)
+    regions = step_one.concated_by_teritories_dfs
+    workers = max(1, min(workers, len(regions), os.cpu_count() or 1))
+    timings = {}
+    if workers == 1:
+        for region, teritory_dict in regions.items():
+            sheets = _region_sheets(step_one, region, teritory_dict)
+            timings[region] = write_region_workbook(
+                config.path_for_po_gorodom / f"{region}.xlsx", sheets, step_one.last_row_indexes, data_manager
+            )
+    else:
+        jobs = {region: _region_sheets(step_one, region, teritory_dict) for region, teritory_dict in regions.items()}
+        # biggest regions first so one large file does not finish alone at the end
+        by_size = sorted(jobs, key=lambda region: -sum(len(sheet[1]) for sheet in jobs[region]))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_export_worker,
+            initargs=(step_one.last_row_indexes, data_manager.drug_reference),
+        ) as pool:
+            futures = {
+                region: pool.submit(_export_region_task, config.path_for_po_gorodom / f"{region}.xlsx", jobs[region])
+                for region in by_size
+            }
+            for region in jobs:
+                timings[region] = futures[region].result()
+
+    # TIMING SUMMARY
+    for region, seconds in timings.items():
+        error_manager.log_info(f"    {region}.xlsx: {seconds:.1f}s")
+    error_manager.log_info(
+        f"  {len(timings)} files in {time.perf_counter() - started:.1f}s "
+        f"(sum of files {sum(timings.values()):.1f}s, workers {workers})"
+    )
+    return timings
+
+
+# PROCESS POOL WORKERS
+_worker_state = {}
+
+def _init_export_worker(last_row_indexes, drug_reference):
+    # regional sheets only read the budget from the data manager
+    data_manager = DataManager()
+    data_manager.add_drug_reference(drug_reference)
+    _worker_state["last_row_indexes"] = last_row_indexes
+    _worker_state["data_manager"] = data_manager
+
+def _export_region_task(path, sheets):
+    return write_region_workbook(path, sheets, _worker_state["last_row_indexes"], _worker_state["data_manager"])
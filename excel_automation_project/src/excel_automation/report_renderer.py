@@ -0,0 +1,196 @@
+import sys
+from pathlib import Path
+# Get current script's directory
+current_dir = Path(__file__).resolve().parent
+# Go up one level to project root
+project_root = current_dir.parent
+# Add project root to Python path
+sys.path.append(str(project_root))
+
+import functools
+from copy import copy
+from io import BytesIO
+import pandas as pd
+from excel_automation.formula_plan import FormulaPlan, column_letter, header_rows
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from common.excel_styles import (
+    REPORT_HEADER, OPTOVIK_TEXT, OPTOVIK_NUMBER, CLIENT_TEXT, CLIENT_NUMBER, FINAL_TEXT, FINAL_NUMBER
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _pandas_index_cell():
+    """
+    A body index cell as the installed pandas writes it with to_excel. The openpyxl path
+    layers the report styles over that cell, and pandas versions style it differently.
+    """
+    frame = pd.DataFrame([[0]], index=["index"], columns=pd.MultiIndex.from_tuples([("group", "drug")]))
+    buffer = BytesIO()
+    frame.to_excel(buffer, engine="openpyxl")
+    ws = load_workbook(buffer).active
+    return ws.cell(row=ws.max_row, column=1)
+
+
+class StreamingReportRenderer():
+    """
+    Write-only renderer for the Vtorichka and regional report sheets.
+
+    Produces the same sheets as `to_excel` + OutlineAndFormulas (outlines, formulas,
+    formatting, widths) but takes everything from a FormulaPlan of the DataFrame and streams
+    every row once through an openpyxl write-only workbook, so no sheet is kept in
+    memory and no cell is visited twice.
+    """
+    def __init__(self, last_row_indexes, list_for_outlining_columns, data_manager):
+        self.dm = data_manager
+
+        self.last_row_indexes = last_row_indexes
+        self.list_for_outlining_columns = list_for_outlining_columns
+
+        self.drug_reference = self.dm.drug_reference
+
+        self.workbook = Workbook(write_only=True)
+        self._styles = None
+
+    # STYLES
+    @staticmethod
+    def _build_styles(ws):
+        """Style arrays of the shared report styles; cells reuse them instead of setting attributes"""
+        def proto(style, base=None):
+            cell = WriteOnlyCell(ws)
+            if base is None or not base.has_style:
+                style.apply_to(cell)
+                return cell._style
+            # the style over the base cell, resolved first so only the final values are registered
+            for attr in ("font", "fill", "border", "alignment", "number_format"):
+                value = getattr(style, attr)
+                setattr(cell, attr, copy(getattr(base, attr)) if value is None else value)
+            return cell._style
+
+        index_cell = _pandas_index_cell()
+
+        return {
+            "header": proto(REPORT_HEADER),
+            # grouped (optovik) rows
+            "group_index": proto(OPTOVIK_TEXT, index_cell),
+            "group_text": proto(OPTOVIK_TEXT),
+            "group_number": proto(OPTOVIK_NUMBER),
+            # customer rows
+            "index": proto(CLIENT_TEXT, index_cell),
+            "text": proto(CLIENT_TEXT),
+            "number": proto(CLIENT_NUMBER),
+            # final sum rows
+            "final_text": proto(FINAL_TEXT),
+            "final_number": proto(FINAL_NUMBER),
+        }
+
+    def _cell(self, ws, value, style):
+        cell = WriteOnlyCell(ws, value)
+        # style arrays are never mutated after planning, so cells can share them
+        cell._style = self._styles[style]
+        return cell
+
+    # WRITING
+    def write_sheet(self, df, sheet, outline_key=None, total_sheet=False):
+        """Stream one report sheet (df as prepared by MapSplitRegion, index written in column A)"""
+        outline_key = sheet if outline_key is None else outline_key
+        ws = self.workbook.create_sheet(title=sheet)
+        if self._styles is None:
+            self._styles = self._build_styles(ws)
+
+        plan = FormulaPlan.from_frame(df, sheet, outline_key, self.last_row_indexes,
+                                      self.list_for_outlining_columns, self.drug_reference, total_sheet)
+        for value in plan.total_sheet_entries:
+            self.dm.add_total_sheet_data(sheet, value)
+        max_column, final_sum, cells = plan.max_column, plan.final_sum, plan.cells
+
+        row_1, row_2, merges = header_rows(df)
+        index_values = df.index.tolist()
+        body = df.astype(object).where(df.notna(), '').to_numpy().tolist()
+
+        # SHEET LAYOUT (must be set before the first row is written)
+        ws.sheet_properties.outlinePr.summaryBelow = False
+        if plan.hidden_cols:
+            ws.sheet_properties.outlinePr.summaryRight = False
+        ws.freeze_panes = 'E3'
+
+        widths = {1: 4, 2: 40, 3: 10, 4: 10}
+        hidden_set = set(plan.hidden_cols)
+        for col in range(1, max_column + 1):
+            dim = ws.column_dimensions[column_letter(col)]
+            if col in hidden_set:
+                dim.outline_level = 1
+                dim.hidden = True
+            dim.width = widths.get(col, 18 if col % 2 == 0 else 11)
+        ws.column_dimensions['A'].hidden = True
+
+        ws.row_dimensions[1].height = 35
+        ws.row_dimensions[2].height = 23
+        ws.row_dimensions[3].hidden = True
+        for row in plan.hidden_rows:
+            ws.row_dimensions[row].outlineLevel = 1
+            ws.row_dimensions[row].hidden = True
+
+        for ref in merges:
+            ws.merged_cells.add(ref)
+
+        # ROWS
+        ws.append([self._cell(ws, value, "header") for value in row_1])
+        ws.append([self._cell(ws, value, "header") for value in row_2])
+        ws.append([])
+
+        grouped = set(plan.grouped_rows)
+        for offset, values in enumerate(body):
+            row = offset + 4
+            overrides = cells.get(row, {})
+            if row in grouped:
+                styles = ("group_index", "group_text", "group_number")
+            else:
+                styles = ("index", "text", "number")
+            row_cells = [self._cell(ws, index_values[offset], styles[0])]
+            for col, value in enumerate(values, start=2):
+                value = overrides.get(col, value)
+                row_cells.append(self._cell(ws, value, styles[1] if col <= 4 else styles[2]))
+            ws.append(row_cells)
+
+        for row in range(final_sum, final_sum + 4):
+            overrides = cells.get(row, {})
+            ws.append([
+                self._cell(ws, overrides.get(col), "final_text" if col <= 4 else "final_number")
+                for col in range(1, max_column + 1)
+            ])
+        return ws
+
+    def write_total_sheet(self, step_two_source):
+        """Total sheet from `total_sheet_writer`, streamed as the first sheet of the workbook"""
+        scratch = Workbook()
+        scratch_ws = scratch.active
+        step_two_source.total_sheet_writer(scratch_ws)
+
+        ws = self.workbook.create_sheet(title="Total")
+        for key, dim in scratch_ws.column_dimensions.items():
+            ws.column_dimensions[key].width = dim.width
+        for key, dim in scratch_ws.row_dimensions.items():
+            if dim.height is not None:
+                ws.row_dimensions[key].height = dim.height
+
+        for row in scratch_ws.iter_rows(min_row=1, max_row=scratch_ws.max_row):
+            row_cells = []
+            for source in row:
+                cell = WriteOnlyCell(ws, source.value)
+                if source.has_style:
+                    cell.font = copy(source.font)
+                    cell.fill = copy(source.fill)
+                    cell.border = copy(source.border)
+                    cell.alignment = copy(source.alignment)
+                    cell.number_format = source.number_format
+                row_cells.append(cell)
+            ws.append(row_cells)
+
+        # Total goes first
+        self.workbook._sheets.remove(ws)
+        self.workbook._sheets.insert(0, ws)
+        return ws
+
+    def save(self, path):
+        self.workbook.save(path)
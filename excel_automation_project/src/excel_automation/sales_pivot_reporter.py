@@ -7,15 +7,17 @@ project_root = current_dir.parent
 # Add project root to Python path
 sys.path.append(str(project_root))
 
+import numpy as np
 import pandas as pd
 from common.config_handler import config
+from common.data_manager import plain_frame
 
 class SalesPivotReporter():
 
     def create_pivot_table(self,merged_df):
         """Create formatted pivot table"""
         try:
-            pivoted_df = merged_df.pivot_table(
+            pivoted_df = plain_frame(merged_df).pivot_table(
                 index=[config.client_header_name,config.region_header_name,config.territory_header_name],
                 columns=config.drugs_header_name,
                 values=[config.quantity_header_name, config.total_sales_header_name],
@@ -29,23 +31,82 @@ class SalesPivotReporter():
     def table_manipulation(self,optovik_df):
         # Flatten and order columns
         try:
-            columns = []
-            for drug in optovik_df.columns.get_level_values(1).unique():
-                columns.extend([(config.quantity_header_name, drug), ( config.total_sales_header_name, drug)])
-            optovik_df = optovik_df.reindex(columns=columns).reset_index()
-            optovik_df.columns = optovik_df.columns.swaplevel(0, 1)
-
-            # rename main headers
-            current_columns = list(optovik_df.columns.values)
-            new_columns = [ (config.main_header_name, config.client_header_name), 
-                            (config.main_header_name, config.region_header_name), 
-                            (config.main_header_name, config.territory_header_name)
-            ]
-            current_columns[:3] = new_columns
-            optovik_df.columns = pd.MultiIndex.from_tuples(current_columns)
-            return optovik_df
+            return self._flatten_pivot(optovik_df, optovik_df.columns.get_level_values(1).unique())
         except Exception as e:
             raise RuntimeError(f"table_manipulation method failed: {e}")
+
+    def _flatten_pivot(self, optovik_df, drugs):
+        """(Количество, drug) / (Сумма продажи, drug) pivot -> (drug, Количество), (drug, Сумма продажи) pairs after the main headers"""
+        columns = []
+        for drug in drugs:
+            columns.extend([(config.quantity_header_name, drug), ( config.total_sales_header_name, drug)])
+        optovik_df = optovik_df.reindex(columns=columns).reset_index()
+        optovik_df.columns = optovik_df.columns.swaplevel(0, 1)
+
+        # rename main headers
+        current_columns = list(optovik_df.columns.values)
+        new_columns = [ (config.main_header_name, config.client_header_name), 
+                        (config.main_header_name, config.region_header_name), 
+                        (config.main_header_name, config.territory_header_name)
+        ]
+        current_columns[:3] = new_columns
+        optovik_df.columns = pd.MultiIndex.from_tuples(current_columns)
+        return optovik_df
+
+    def pivot_all_optoviks(self, optoviks):
+        """
+        Batch mode: {sheet: raw optovik df} -> {sheet: flattened pivot}, the same frames
+        create_pivot_table + table_manipulation give sheet by sheet.
+
+        All sheets are stacked into one long frame and aggregated by a single
+        groupby().sum().unstack() keyed by sheet, client, region, territory and drug.
+        Keys are categoricals, so the grouping works on integer codes and the client and
+        drug names are stored once. Each sheet is then a row slice of the wide table.
+        """
+        try:
+            keys = [config.client_header_name, config.region_header_name, config.territory_header_name]
+            values = [config.quantity_header_name, config.total_sales_header_name]
+            sheets = list(optoviks)
+            long_df = pd.concat([df[keys + [config.drugs_header_name] + values] for df in optoviks.values()], ignore_index=True)
+            # typed frames already share sorted category sets, so astype keeps them as they are
+            for col in keys + [config.drugs_header_name]:
+                long_df[col] = long_df[col].astype("category")
+            long_df[values] = long_df[values].astype("float64")
+            sheet_key = pd.Categorical.from_codes(
+                np.repeat(np.arange(len(sheets)), [len(df) for df in optoviks.values()]), categories=sheets
+            )
+
+            # sum of an all-NaN group is 0 and NaN keys are dropped, as in pivot_table
+            wide = (long_df.groupby([sheet_key] + keys + [config.drugs_header_name], observed=True, sort=True)[values]
+                    .sum()
+                    .unstack(config.drugs_header_name))
+            del long_df
+            # back to plain labels so the split frames look like pivot_table output
+            wide.index = wide.index.set_levels([level.astype(object) for level in wide.index.levels])
+            wide.columns = wide.columns.set_levels([level.astype(object) for level in wide.columns.levels])
+            drug_labels = wide.columns.get_level_values(1)
+
+            # rows are sorted by sheet first, so every sheet is one contiguous block
+            sheet_codes = wide.index.codes[0]
+            starts = np.flatnonzero(np.r_[True, sheet_codes[1:] != sheet_codes[:-1]])
+            stops = np.r_[starts[1:], len(sheet_codes)]
+            blocks = {
+                wide.index.levels[0][sheet_codes[start]]: (start, stop) for start, stop in zip(starts, stops)
+            } if len(sheet_codes) else {}
+
+            pivoted = {}
+            for sheet in sheets:
+                # a sheet without any complete client/region/territory key keeps its empty pivot
+                start, stop = blocks.get(sheet, (0, 0))
+                block = wide.iloc[start:stop].droplevel(0)
+                # drugs the sheet has: pivot_table drops the all-NaN columns
+                present = block.notna().any().to_numpy()
+                drugs = pd.unique(drug_labels[present])
+                pivoted[sheet] = self._flatten_pivot(block, sorted(drugs))
+            return pivoted
+        except Exception as e:
+            raise RuntimeError(f"pivot_all_optoviks method failed: {e}")
+
 if __name__ == "__main__":
     #-PROCESSING
 
@@ -7,48 +7,101 @@ project_root = current_dir.parent
 # Add project root to Python path
 sys.path.append(str(project_root))
 
+import os
+from concurrent.futures import ProcessPoolExecutor
 from common.config_handler import config
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import Alignment, Font, PatternFill
+from common.excel_styles import RangeStyler, CellStyle, HEADER_CENTER, NUMBER, BOLD_FONT, CENTER
 from dashboard_automation.new_database_etl import SalesDataWarehouse
+from common.data_manager import plain_frame
+from common.run_profiler import run_profiler
 import pandas as pd
 from datetime import datetime
 
+def _with_group_headers(blocks):
+    """
+    [(group_name, df), ...] -> one frame where every block is numbered 1..n under a row holding
+    the group name, and the Excel rows of those header rows (row 1 is the column header).
+    """
+    parts, header_rows = [], []
+    row_index = 2
+    for group_name, group in blocks:
+        group = group.reset_index(drop=True)
+        group.index = group.index + 1
+        group.index.name = "№"
+
+        # Create empty row with only the group name in the first cell
+        header_data = [group_name] + [''] * (group.shape[1] - 1)
+        header_index = ['']  # Empty index column
+        header_row = pd.DataFrame([header_data], columns=group.columns, index=header_index)
+
+        # Append header and group
+        parts.append(pd.concat([header_row, group], axis=0))
+        header_rows.append(row_index)
+        row_index += len(group) + 1  # 1 for the header row, len(group) for data rows
+    return pd.concat(parts), header_rows
+
+
+def _product_group_tables(group_name, group):
+    """Stage-1 sheet (Region/Territory x drug pivot) and Проверка block of one product group"""
+    pivoted_df = group.pivot_table(
+            index=["Region","Territory", "Product_groups"],
+            columns="Product",
+            values=["Quantity", "TotalSales"],
+            aggfunc='sum'
+        )
+
+    columns = []
+    for drug in pivoted_df.columns.get_level_values(1).unique():
+        columns.extend([("Quantity", drug), ( "TotalSales", drug)])
+    pivoted_df = pivoted_df.reindex(columns=columns).reset_index()
+    pivoted_df.columns = pivoted_df.columns.swaplevel(0, 1)
+
+    # Aggregate by Product inside the group
+    aggregated = group.groupby('Product').agg(
+        total_quantity=('Quantity', 'sum'),
+        total_sales=('TotalSales', 'sum')
+    ).reset_index()
+    return group_name, pivoted_df, aggregated
+
+
 class StagesProcesses():
     def __init__(self, data_manager):
         self.dm = data_manager
         sales_dw = SalesDataWarehouse()
         self.main_df = sales_dw.transform_data(self.dm.final_raw_optoviks, self.dm.drug_groups_df_melted, stage = True)
-
+        # stage tables group and pivot on plain labels
+        self.main_df = plain_frame(self.main_df)
+
+    def stage1_tables(self, df):
+        """
+        Every product group's pivot sheet and Проверка block from one groupby pass.
+        config 'stage_workers' > 1 builds the groups' tables in a process pool.
+        """
+        groups = list(df.groupby("Product_groups"))
+        workers = max(1, min(config.stage_workers, len(groups), os.cpu_count() or 1))
+        if workers == 1:
+            return [_product_group_tables(group_name, group) for group_name, group in groups]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_product_group_tables, *zip(*groups)))
+
+    @run_profiler.staged("stage1")
     def stage1_process(self,df):
+        tables = self.stage1_tables(df)
+        # only the workbook assembly runs here, sheet by sheet
         with pd.ExcelWriter("data/final/stage-1.xlsx", engine='openpyxl') as writer:
-            for group_name, group in df.groupby("Product_groups"):
-                pivoted_df = group.pivot_table(
-                        index=["Region","Territory", "Product_groups"],
-                        columns="Product",
-                        values=["Quantity", "TotalSales"],
-                        aggfunc='sum'
-                    )
-                
-                columns = []
-                for drug in pivoted_df.columns.get_level_values(1).unique():
-                    columns.extend([("Quantity", drug), ( "TotalSales", drug)])
-                pivoted_df = pivoted_df.reindex(columns=columns).reset_index()
-                pivoted_df.columns = pivoted_df.columns.swaplevel(0, 1)
-
+            for group_name, pivoted_df, _ in tables:
                 pivoted_df.to_excel(writer, sheet_name=group_name, index=True)
 
                 ws = writer.sheets[group_name]
                 total_row = ws.max_row+1
                 # STYLING
+                styler = RangeStyler(ws)
                 # # alignment
-                for row in ws.iter_rows(min_row=1, max_row=2):
-                    for cell in row:
-                        cell.alignment = Alignment(horizontal='center',vertical='center',wrap_text=True)
+                styler.apply(HEADER_CENTER, 1, 2)
                 # # number formating cells
-                for row in ws.iter_rows(min_row=3, max_row=ws.max_row, min_col=5, max_col=ws.max_column):
-                    for cell in row:
-                        cell.number_format = '_(* #,##0.00_);_(* -#,##0.00_);_(* "-"??_);_(@_)'
+                styler.apply(NUMBER, 3, ws.max_row, 5, ws.max_column)
                                 # columns width
                 for col in range(2,ws.max_column+1):
                     letter = get_column_letter(col)
@@ -65,49 +118,24 @@ class StagesProcesses():
                 ws.row_dimensions[2].height = 35
 
             # ////////////////////////////////////////////////////
-            all_teams_with_headers = []
-
-            # Aggregate by both Product_groups and Product
-            self.aggregated_data = df.groupby(['Product_groups', 'Product']).agg(
-                total_quantity=('Quantity', 'sum'),
-                total_sales=('TotalSales', 'sum')
-            ).reset_index()
-
-            # Group by Product_groups
-            for group_name, group in self.aggregated_data.groupby("Product_groups"):
-                group = group.drop(columns="Product_groups")
-                group = group.reset_index(drop=True)
-                group.index = group.index + 1
-                group.index.name = "№"
-
-                # Create empty row with only the group name in the first cell
-                header_data = [group_name] + [''] * (group.shape[1] - 1)
-                header_index = ['']  # Empty index column
-                header_row = pd.DataFrame([header_data], columns=group.columns, index=header_index)
-
-                # Append header and group
-                all_teams_with_headers.append(pd.concat([header_row, group], axis=0))
-            final_df = pd.concat(all_teams_with_headers)
+            # Проверка: the per-group aggregates under their group header rows
+            final_df, header_rows = _with_group_headers(
+                [(group_name, aggregated) for group_name, _, aggregated in tables]
+            )
             final_df.to_excel(writer, sheet_name="Проверка", index=True)
 
-            self.styling_proverka(writer,"Проверка", self.aggregated_data, final_df, "92D050")
+            self.styling_proverka(writer,"Проверка", header_rows, final_df, "92D050")
 
-    def styling_proverka(self,writer,sheet_name, aggregated_data, final_df, color):
-            # Now style each group header row
+    def styling_proverka(self,writer,sheet_name, header_rows, final_df, color):
+            # Now style each group header row (rows recorded by _with_group_headers)
             sheet = writer.sheets[sheet_name]
-            bold_font = Font(bold=True)
-            row_index = 2  # Excel rows are 1-based, and row 1 is the column header
-            gray_fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-            center_align = Alignment(horizontal='center', vertical='center')
-            for group_name, group in aggregated_data.groupby("Product_groups"):
-                # Apply bold font to this group's header row
-                for col in range(1, len(group.columns) + 1):  # +1 for index, +1 for 1-based
-                    cell = sheet.cell(row=row_index, column=col)
-                    cell.font = bold_font
-                    cell.fill = gray_fill
-                    cell.alignment = center_align
-
-                row_index += len(group) + 1  # 1 for the header row, len(group) for data rows
+            styler = RangeStyler(sheet)
+            group_header = CellStyle(
+                "group_header", BOLD_FONT, PatternFill(start_color=color, end_color=color, fill_type="solid"), alignment=CENTER
+            )
+            for row_index in header_rows:
+                # Apply bold font to this group's header row (index column included)
+                styler.apply(group_header, row_index, row_index, 1, len(final_df.columns) + 1)
 
 
             # ////////////////////////////////////////////////////
@@ -122,14 +150,9 @@ class StagesProcesses():
                     sheet.column_dimensions[col_letter].width = 22  # Set width (adjust as needed)
 
             # /////////////////////
-            number_format = '_(* #,##0.00_);_(* -#,##0.00_);_(* "-"??_);_(@_)'
-            target_col_indices = range(3,sheet.max_column+1)  # 1-based: Column C (3), D (4)
-
-            for row in range(2, sheet.max_row + 1):
-                for col_idx in target_col_indices:
-                    col_letter = get_column_letter(col_idx)
-                    sheet[f"{col_letter}{row}"].number_format = number_format
+            styler.apply(NUMBER, 2, sheet.max_row, 3, sheet.max_column)  # 1-based: Column C (3), D (4)
 
+    @run_profiler.staged("stage2_1")
     def stage2_1_process(self,df):
         month_name = datetime.today().strftime('%B')
         list_stage2_total = []
@@ -147,27 +170,15 @@ class StagesProcesses():
                     list_stage2_total.append(renamed_df)
 
 
-                    all_teams_with_headers = []
                     # Group by Product_groups
-                    for group_name, group in aggregated_data.groupby("Product_groups"):
-                        group = group.drop(columns="Product_groups")
-                        group = group.reset_index(drop=True)
-                        group.index = group.index + 1
-                        group.index.name = "№"
-
-                        # Create empty row with only the group name in the first cell
-                        header_data = [group_name] + [''] * (group.shape[1] - 1)
-                        header_index = ['']  # Empty index column
-                        header_row = pd.DataFrame([header_data], columns=group.columns, index=header_index)
-
-                        # Append header and group
-                        all_teams_with_headers.append(pd.concat([header_row, group], axis=0))
-
-                    final_df = pd.concat(all_teams_with_headers)
+                    final_df, header_rows = _with_group_headers(
+                        [(group_name, group.drop(columns="Product_groups"))
+                         for group_name, group in aggregated_data.groupby("Product_groups")]
+                    )
                     
                     final_df.rename(columns={'total_quantity': month_name, 'Product':'Name of Products'}, inplace=True)
                     final_df.to_excel(writer,sheet_name=region_name, index=True)
-                    self.styling_proverka(writer, region_name, aggregated_data, final_df, "E6B8B7")
+                    self.styling_proverka(writer, region_name, header_rows, final_df, "E6B8B7")
 
             _stage_2_1_mini(no_reserve_df, 'Region')
             _stage_2_1_mini(only_reserve_df, 'Optovik')
@@ -176,23 +187,10 @@ class StagesProcesses():
         # with pd.ExcelWriter("data/stage-2_Productwise_total.xlsx", engine='openpyxl') as writer:
             dfs = [df.set_index(["Product", "Product_groups"]) for df in list_stage2_total]
             result = pd.concat(dfs, axis=1).reset_index()
-            all_teams_with_headers2 = []
             # Group by Product_groups
-            for group_name, group in result.groupby("Product_groups"):
-                group = group.drop(columns="Product_groups")
-                group = group.reset_index(drop=True)
-                group.index = group.index + 1
-                group.index.name = "№"
-
-                # Create empty row with only the group name in the first cell
-                header_data = [group_name] + [''] * (group.shape[1] - 1)
-                header_index = ['']  # Empty index column
-                header_row = pd.DataFrame([header_data], columns=group.columns, index=header_index)
-
-                # Append header and group
-                all_teams_with_headers2.append(pd.concat([header_row, group], axis=0))
-
-            final_df2 = pd.concat(all_teams_with_headers2)
+            final_df2, _ = _with_group_headers(
+                [(group_name, group.drop(columns="Product_groups")) for group_name, group in result.groupby("Product_groups")]
+            )
             final_df2.rename(columns={'Product':'Name of Products'}, inplace=True)
             final_df2.to_excel(writer,sheet_name="Total", index=True)
 
@@ -235,6 +233,7 @@ class StagesProcesses():
                 elif col_idx in range(3,ws.max_column+1):
                     ws.column_dimensions[col_letter].width = 12
           
+    @run_profiler.staged("stage2_2")
     def stage2_2_process(self,df):
 
         with pd.ExcelWriter("data/final/stage-2_Total_sales.xlsx", engine='openpyxl') as writer:
@@ -248,14 +247,11 @@ class StagesProcesses():
 
             total_row = ws.max_row+1
             # STYLING
+            styler = RangeStyler(ws)
             # # alignment
-            for row in ws.iter_rows(min_row=1, max_row=1):
-                for cell in row:
-                    cell.alignment = Alignment(horizontal='center',vertical='center',wrap_text=True)
+            styler.apply(HEADER_CENTER, 1, 1)
             # # number formating cells
-            for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=4, max_col=ws.max_column):
-                for cell in row:
-                    cell.number_format = '_(* #,##0.00_);_(* -#,##0.00_);_(* "-"??_);_(@_)'
+            styler.apply(NUMBER, 2, ws.max_row, 4, ws.max_column)
 
             # columns width
             for col_idx in range(1, ws.max_column + 1):  # 1-based indexing
@@ -8,10 +8,13 @@ project_root = current_dir.parent
 sys.path.append(str(project_root))
 
 from common.error_handler import error_manager, ExpectedCustomError
+from common.run_profiler import run_profiler
 from common.config_handler import config
 from excel_automation.sales_pivot_reporter import SalesPivotReporter
 from excel_automation.map_split_region import MapSplitRegion
 from excel_automation.outlining_apply_formula import OutlineAndFormulas
+from excel_automation.report_renderer import StreamingReportRenderer
+from excel_automation.region_exporter import export_region_files
 from excel_automation.stage1_2_3_process import StagesProcesses
 from common.data_manager import DataManager
 from common.drug_mapping_validator import DrugMappingValidator
@@ -19,153 +22,182 @@ from common.region_teritory_finder import TerritoryHandler
 import pandas as pd
 
 
+# (stage, DataManager containers it reads, containers it fills); finish_stage frees what no later stage reads
+STAGES = [
+    ("validation", [], ["mapped_optoviks", "drug_name_dict", "drug_reference", "drug_groups_df", "drug_groups_df_melted"]),
+    ("territories", ["mapped_optoviks"], ["final_raw_optoviks", "all_regions_list", "all_teritories_list"]),
+    ("pivot", ["final_raw_optoviks"], ["pivoted_optoviks"]),
+    ("split_regions", ["pivoted_optoviks", "drug_groups_df"], []),
+    ("vtorichka", ["drug_groups_df", "drug_reference"], ["total_sheet_data"]),
+    ("region_files", ["drug_groups_df", "drug_reference"], []),
+    ("stage_files", ["final_raw_optoviks", "drug_groups_df_melted"], []),
+]
+
+
+def write_vtorichka_streaming(step_one, data_manager):
+    """Vtorichka workbook (all region sheets + Total) through the write-only renderer"""
+    renderer = StreamingReportRenderer(step_one.last_row_indexes, step_one.list_for_outlining_columns, data_manager)
+    for sheet, df in step_one.concated_by_regions_dfs.items():
+        reordered_df = step_one.apply_column_layout(df)
+        # apply_column_layout sets the outlining column list of this frame
+        renderer.list_for_outlining_columns = step_one.list_for_outlining_columns
+        renderer.write_sheet(reordered_df, sheet, total_sheet=True)
+
+    # TOTAL SHEET DATA (first sheet of the workbook)
+    renderer.write_total_sheet(OutlineAndFormulas(step_one.last_row_indexes, step_one.list_for_outlining_columns, data_manager))
+    renderer.save(config.path_for_vtorichka)
+    error_manager.log_info(f"  Workbook saved as: {config.path_for_vtorichka.name}\n")
+
+
 def process_all_tasks():
-    data_manager = DataManager()
+    data_manager = DataManager(typed_frames=config.typed_frames)
+    data_manager.plan_stages(STAGES)
     #-VALIDATION 
-    validator = DrugMappingValidator(data_manager, False)    
-    validator.process_all()
-    error_manager.log_info("Validation processes completed successfully.\n")
+    with run_profiler.stage("validation") as stage:
+        validator = DrugMappingValidator(data_manager, False)    
+        validator.process_all()
+        stage["rows"] = sum(len(df) for df in data_manager.mapped_optoviks.values())
+        data_manager.finish_stage("validation")
+        error_manager.log_info("Validation processes completed successfully.\n")
 
     # REGION AND TERITORY FINDING
-    # load teritory json
-    error_manager.log_info("Region and territory identification process...")
-    territory_handler = TerritoryHandler(data_manager)
-    region_mapping = territory_handler._load_region_mapping(config.path_for_region_js)
-    territory_patterns = territory_handler._compile_territory_patterns(config.path_for_teritory_js)
-
-    for sheet,optovik_df in data_manager.mapped_optoviks.items():
-        # Process territories 
-        client_data = optovik_df[[config.client_header_name, config.region_header_name, config.territory_header_name]].copy()
-        territory_processed = territory_handler.region_territory_writer(client_data,region_mapping,territory_patterns,sheet)
-        
-        optovik_df[[config.client_header_name, config.region_header_name, config.territory_header_name]] = territory_processed
-
-        # STORE DATA
-        data_manager.add_final_raw_optoviks(sheet,optovik_df)
-
-    # AFTER PROCESSING ALL DATAFRAMES: Extract any still-missing values
-    has_missing = TerritoryHandler.extract_all_missing_values(data_manager.final_raw_optoviks)
-    if has_missing:
-        raise ExpectedCustomError(
+    with run_profiler.stage("territories") as stage:
+        # load teritory json
+        error_manager.log_info("Region and territory identification process...")
+        territory_handler = TerritoryHandler(data_manager)
+        region_mapping = territory_handler._load_region_mapping(config.path_for_region_js)
+        territory_matcher = territory_handler._compile_territory_patterns(config.path_for_teritory_js)
+
+        # Process territories (config 'territory_workers' > 1 spreads the sheets over processes)
+        # plain object columns: the handler writes new regions and territories into them
+        client_frames = {
+            sheet: optovik_df[[config.client_header_name, config.region_header_name, config.territory_header_name]].astype(object)
+            for sheet, optovik_df in data_manager.mapped_optoviks.items()
+        }
+        territory_processed = territory_handler.region_territory_writer_all(client_frames, region_mapping, territory_matcher, config.territory_workers)
+
+        for sheet,optovik_df in data_manager.mapped_optoviks.items():
+            optovik_df[[config.client_header_name, config.region_header_name, config.territory_header_name]] = territory_processed[sheet]
+
+            # STORE DATA
+            data_manager.add_final_raw_optoviks(sheet,optovik_df)
+
+        stage["rows"] = sum(len(df) for df in data_manager.final_raw_optoviks.values())
+        # AFTER PROCESSING ALL DATAFRAMES: Extract any still-missing values
+        has_missing = TerritoryHandler.extract_all_missing_values(data_manager.final_raw_optoviks)
+        if has_missing:
+            raise ExpectedCustomError(
             
-        "\n⚠️ WARNING: Some territories are still missing after automated filling."
-        "\n\n📁 A file has been created at:"
-        f"\n{config.path_for_regions_manual_correction}"
-        "\n\nThis file contains the list of clients with missing Region or Territory information."
-        "\n\n📌 HOW TO FIX:"
-        "\n1. Open the Excel file above and manually fill in the missing **Region** and **Territory** values for each client."
-        f"\n2. Save the file with the following exact name: {config.regions_to_be_corrected}"
-        "\n3. Move the file to the 'prepared' folder inside your project directory: /data/prepared/"
-        "\n4. After completing the above steps, re-run the script."
-
-        "\n\nOnce these corrections are applied, the script will continue processing automatically."
-        )
-    else:
-        error_manager.log_info("All territories successfully processed with no missing values\n")
+            "\n⚠️ WARNING: Some territories are still missing after automated filling."
+            "\n\n📁 A file has been created at:"
+            f"\n{config.path_for_regions_manual_correction}"
+            "\n\nThis file contains the list of clients with missing Region or Territory information."
+            "\n\n📌 HOW TO FIX:"
+            "\n1. Open the Excel file above and manually fill in the missing **Region** and **Territory** values for each client."
+            f"\n2. Save the file with the following exact name: {config.regions_to_be_corrected}"
+            "\n3. Move the file to the 'prepared' folder inside your project directory: /data/prepared/"
+            "\n4. After completing the above steps, re-run the script."
+
+            "\n\nOnce these corrections are applied, the script will continue processing automatically."
+            )
+        else:
+            data_manager.finish_stage("territories")
+            error_manager.log_info("All territories successfully processed with no missing values\n")
 
 
     # PIVOT TABLE
-    error_manager.log_info("Transforming Tables into pivot tabls...")
-    reporter = SalesPivotReporter()
-    for sheet, optovik_df in data_manager.final_raw_optoviks.items():
-        pivoted_df = reporter.create_pivot_table(optovik_df)
-        final_df = reporter.table_manipulation(pivoted_df)
-        # STORE DATA
-        data_manager.add_pivoted_optovik(sheet, final_df)
-    error_manager.log_info("  Completed.\n")
+    with run_profiler.stage("pivot") as stage:
+        error_manager.log_info("Transforming Tables into pivot tabls...")
+        reporter = SalesPivotReporter()
+        if config.batch_pivot:
+            for sheet, final_df in reporter.pivot_all_optoviks(data_manager.final_raw_optoviks).items():
+                # STORE DATA
+                data_manager.add_pivoted_optovik(sheet, final_df)
+        else:
+            for sheet, optovik_df in data_manager.final_raw_optoviks.items():
+                pivoted_df = reporter.create_pivot_table(optovik_df)
+                final_df = reporter.table_manipulation(pivoted_df)
+                # STORE DATA
+                data_manager.add_pivoted_optovik(sheet, final_df)
+        stage["rows"] = sum(len(df) for df in data_manager.pivoted_optoviks.values())
+        data_manager.finish_stage("pivot")
+        error_manager.log_info("  Completed.\n")
 
 # //////////////////////////////
     # IMPORTANT STEP
         
-    error_manager.log_info("Creating a file with separate sheets for each region...")
-    step_one = MapSplitRegion(data_manager)
-    step_one.load_and_prepare_data()
-    step_one.split_dfs_by_region()
-    step_one.concat_dataframes()
-
-    # Save main vtorichka to Excel
-    with pd.ExcelWriter(config.path_for_vtorichka, engine='openpyxl') as writer:
-        for sheet, df in step_one.concated_by_regions_dfs.items():
-            # Process DataFrame
-            new_df = step_one.add_empty_drug_group_columns(df)
-            reordered_df = step_one.reorder_columns_by_drug_grouping(new_df)
-            # Write to Excel
-            reordered_df.to_excel(writer, sheet_name=sheet, index=True)
-            # Get the openpyxl worksheet object
-            ws = writer.sheets[sheet]
-            step_two = OutlineAndFormulas(step_one.last_row_indexes, step_one.list_for_outlining_columns, data_manager)
-            # Apply modifications
-            ws = step_two.apply_outline_to_customers(ws, sheet)
-            ws = step_two.apply_outline_to_drugs(ws)
-            ws = step_two.apply_excel_functions(ws, sheet,total_sheet=True)
-            step_two.apply_formatting(ws)
-
-        # TOTAL SHEET DATA
-        custom_ws = writer.book.create_sheet(title="Total")
-        step_two.total_sheet_writer(custom_ws)
-        # Reorder sheets - put Total sheet as first sheet,
-        sheets = writer.book._sheets
-        total_sheet = writer.book['Total']
-        sheets.remove(total_sheet)
-        sheets.insert(0, total_sheet)
-        writer.book._sheets = sheets
-
-    error_manager.log_info(f"  Workbook saved as: {config.path_for_vtorichka.name}\n")
-
-
-    error_manager.log_info("Exporting Vtorichka data into individual files by region, with separate sheets for each territory...")
-    for region, teritory_dict in step_one.concated_by_teritories_dfs.items():
-        with pd.ExcelWriter(config.path_for_po_gorodom / f"{region}.xlsx", engine='openpyxl') as writer:
-            # FIRST SAVE EACH REGION TO AN EXCEL FILE
-            region_df = step_one.concated_by_regions_dfs[region]
-
-            proces_df = step_one.add_empty_drug_group_columns(region_df)
-            proces_df = step_one.reorder_columns_by_drug_grouping(proces_df)
-
-            # SAVE IT
-            proces_df.to_excel(writer, sheet_name=region, index=True)
-            ws = writer.sheets[region]
-            step_two = OutlineAndFormulas(step_one.last_row_indexes, step_one.list_for_outlining_columns, data_manager)
-            # Apply modifications
-            ws = step_two.apply_outline_to_customers(ws, region)
-            ws = step_two.apply_outline_to_drugs(ws)
-            ws = step_two.apply_excel_functions(ws, region)
-            step_two.apply_formatting(ws)
-
-            if len(teritory_dict.keys()) < 2:
-                continue
-
-            for teritory, df in teritory_dict.items():
-                proces_df = step_one.add_empty_drug_group_columns(df)
-                proces_df = step_one.reorder_columns_by_drug_grouping(proces_df)
-                proces_df.to_excel(writer, sheet_name=teritory)
-                # SAVE IT
-                proces_df.to_excel(writer, sheet_name=teritory, index=True)
-                ws = writer.sheets[teritory]
-                step_two = OutlineAndFormulas(step_one.last_row_indexes, step_one.list_for_outlining_columns,data_manager)
-                # Apply modifications
-                ws = step_two.apply_outline_to_customers(ws, f"{teritory}_|_")
-                ws = step_two.apply_outline_to_drugs(ws)
-                ws = step_two.apply_excel_functions(ws, teritory)
-                step_two.apply_formatting(ws)
-    error_manager.log_info(f"  All Workbooks saved in: {config.path_for_po_gorodom}\n")
+    with run_profiler.stage("split_regions") as stage:
+        error_manager.log_info("Creating a file with separate sheets for each region...")
+        step_one = MapSplitRegion(data_manager)
+        step_one.load_and_prepare_data()
+        step_one.split_dfs_by_region()
+        step_one.concat_dataframes()
+        stage["rows"] = report_rows = sum(len(df) for df in step_one.concated_by_regions_dfs.values())
+        data_manager.finish_stage("split_regions")
+
+    with run_profiler.stage("vtorichka", rows=report_rows):
+        if config.report_writer == "streaming":
+            write_vtorichka_streaming(step_one, data_manager)
+        else:
+            # Save main vtorichka to Excel
+            with pd.ExcelWriter(config.path_for_vtorichka, engine='openpyxl') as writer:
+                for sheet, df in step_one.concated_by_regions_dfs.items():
+                    # Process DataFrame
+                    reordered_df = step_one.apply_column_layout(df)
+                    # Write to Excel
+                    reordered_df.to_excel(writer, sheet_name=sheet, index=True)
+                    # Get the openpyxl worksheet object
+                    ws = writer.sheets[sheet]
+                    step_two = OutlineAndFormulas(step_one.last_row_indexes, step_one.list_for_outlining_columns, data_manager)
+                    # Apply modifications
+                    ws = step_two.apply_outline_and_formulas(ws, sheet, total_sheet=True)
+                    step_two.apply_formatting(ws)
+
+                # TOTAL SHEET DATA
+                custom_ws = writer.book.create_sheet(title="Total")
+                step_two.total_sheet_writer(custom_ws)
+                # Reorder sheets - put Total sheet as first sheet,
+                sheets = writer.book._sheets
+                total_sheet = writer.book['Total']
+                sheets.remove(total_sheet)
+                sheets.insert(0, total_sheet)
+                writer.book._sheets = sheets
+
+            error_manager.log_info(f"  Workbook saved as: {config.path_for_vtorichka.name}\n")
+
+        data_manager.finish_stage("vtorichka")
+
+    with run_profiler.stage("region_files", rows=report_rows):
+        error_manager.log_info("Exporting Vtorichka data into individual files by region, with separate sheets for each territory...")
+        export_region_files(step_one, data_manager, config.region_export_workers)
+        data_manager.finish_stage("region_files")
+        error_manager.log_info(f"  All Workbooks saved in: {config.path_for_po_gorodom}\n")
 
     # //////////////test////////////////
 
-    error_manager.log_info("Exporting Stage files...")
-    staging = StagesProcesses(data_manager)
-    staging.run_stage()
-    error_manager.log_info(f"  Stage files saved.\n")
+    with run_profiler.stage("stage_files") as stage:
+        error_manager.log_info("Exporting Stage files...")
+        staging = StagesProcesses(data_manager)
+        stage["rows"] = len(staging.main_df)
+        staging.run_stage()
+        data_manager.finish_stage("stage_files")
+        error_manager.log_info(f"  Stage files saved.\n")
 
     # ////////////////////////////////
 
 def main():
     try:
+        if config.log_mode == "queued":
+            error_manager.start_queue()
+        run_profiler.start("vt_main")
         process_all_tasks()
+        run_profiler.finish("completed")
         error_manager.log_complete(f"ALL VTORICHKA CREATION PROCESSES COMPLETED SUCCESSFULY.")
     except ExpectedCustomError as e:
+        run_profiler.finish("stopped")
         error_manager.log_error(e)
     except Exception as e:
+        run_profiler.finish("failed")
         error_manager.log_exception(e)
 
 if __name__ == "__main__":